@@ -0,0 +1,124 @@
+"""
+Storage and filter speed of free-text sport/city/state columns versus
+integer keys into lookup tables.
+
+Builds both layouts in scratch SQLite databases with an index on each
+filtered column and compares the file size, the size of the filter indexes
+and the time to filter by city. The lookup layout runs the query
+list_stadiums runs: the integer key compared with the id from a scalar
+subquery on the city name. "ids only" reads just the matching ids, which
+is the index lookup on its own; "full rows" also joins the names the
+response needs.
+
+    python benchmarks/bench_lookup_tables.py [rows]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import timeit
+
+TEXT_SCHEMA = """
+CREATE TABLE stadium (
+    id integer PRIMARY KEY AUTOINCREMENT, name varchar(100) UNIQUE,
+    sport varchar(100), city varchar(100), state varchar(100), capacity integer);
+CREATE INDEX stadium_sport ON stadium (sport);
+CREATE INDEX stadium_city ON stadium (city);
+CREATE INDEX stadium_state ON stadium (state);
+"""
+
+LOOKUP_SCHEMA = """
+CREATE TABLE sport (id integer PRIMARY KEY AUTOINCREMENT, name varchar(100) UNIQUE);
+CREATE TABLE city (id integer PRIMARY KEY AUTOINCREMENT, name varchar(100) UNIQUE);
+CREATE TABLE state (id integer PRIMARY KEY AUTOINCREMENT, name varchar(100) UNIQUE);
+CREATE TABLE stadium (
+    id integer PRIMARY KEY AUTOINCREMENT, name varchar(100) UNIQUE,
+    sport_ref_id bigint REFERENCES sport (id), city_ref_id bigint REFERENCES city (id),
+    state_ref_id bigint REFERENCES state (id), capacity integer);
+CREATE INDEX stadium_sport ON stadium (sport_ref_id, capacity, id);
+CREATE INDEX stadium_city ON stadium (city_ref_id, id);
+CREATE INDEX stadium_state ON stadium (state_ref_id, id);
+"""
+
+FILTER_INDEXES = ('stadium_sport', 'stadium_city', 'stadium_state')
+
+
+def index_size(db):
+    """Bytes used by the filter indexes, or None without the dbstat table."""
+    try:
+        placeholders = ', '.join('?' * len(FILTER_INDEXES))
+        return db.execute(
+            f'SELECT SUM(pgsize) FROM dbstat WHERE name IN ({placeholders})', FILTER_INDEXES
+        ).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+
+
+def best(func, repeat=5, number=200):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    random.seed(0)
+    sports = [f'Professional Sport League {i}' for i in range(20)]
+    cities = [f'Metropolitan City Number {i}' for i in range(2000)]
+    states = [f'State or Province {i}' for i in range(60)]
+    rows = [
+        (f'Stadium {i}', random.choice(sports), random.choice(cities), random.choice(states), i % 100000)
+        for i in range(count)
+    ]
+    target = cities[7]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, 'text.sqlite3')
+        text = sqlite3.connect(text_path)
+        text.executescript(TEXT_SCHEMA)
+        text.executemany('INSERT INTO stadium (name, sport, city, state, capacity) VALUES (?, ?, ?, ?, ?)', rows)
+        text.commit()
+
+        lookup_path = os.path.join(tmp, 'lookup.sqlite3')
+        lookup = sqlite3.connect(lookup_path)
+        lookup.executescript(LOOKUP_SCHEMA)
+        ids = {}
+        for table, names in (('sport', sports), ('city', cities), ('state', states)):
+            lookup.executemany(f'INSERT INTO {table} (name) VALUES (?)', [(name,) for name in names])
+            ids[table] = dict(lookup.execute(f'SELECT name, id FROM {table}'))
+        lookup.executemany(
+            'INSERT INTO stadium (name, sport_ref_id, city_ref_id, state_ref_id, capacity) VALUES (?, ?, ?, ?, ?)',
+            [(name, ids['sport'][sport], ids['city'][city], ids['state'][state], capacity)
+             for name, sport, city, state, capacity in rows],
+        )
+        lookup.commit()
+
+        text.execute('ANALYZE')
+        lookup.execute('ANALYZE')
+        city_id = '(SELECT id FROM city WHERE name = ?)'
+        queries = {
+            'ids only': (
+                'SELECT id FROM stadium WHERE city = ?',
+                f'SELECT id FROM stadium WHERE city_ref_id = {city_id}',
+            ),
+            'full rows': (
+                'SELECT id, name, sport, city, state, capacity FROM stadium WHERE city = ?',
+                'SELECT s.id, s.name, sp.name, c.name, st.name, s.capacity FROM stadium s '
+                'JOIN sport sp ON sp.id = s.sport_ref_id JOIN city c ON c.id = s.city_ref_id '
+                f'JOIN state st ON st.id = s.state_ref_id WHERE s.city_ref_id = {city_id}',
+            ),
+        }
+        times = {'text columns': [], 'lookup tables': []}
+        for text_query, lookup_query in queries.values():
+            times['text columns'].append(best(lambda: text.execute(text_query, (target,)).fetchall()))
+            times['lookup tables'].append(best(lambda: lookup.execute(lookup_query, (target,)).fetchall()))
+
+        print(f'{count} stadiums, filter by city')
+        print(f'{"layout":<14} {"db size":>12} {"index size":>12}' + ''.join(f' {name:>12}' for name in queries))
+        for layout, db, path in (('text columns', text, text_path), ('lookup tables', lookup, lookup_path)):
+            size = index_size(db)
+            print(f'{layout:<14} {os.path.getsize(path):>12,} {f"{size:,}" if size else "n/a":>12}'
+                  + ''.join(f' {t * 1e6:>9.1f} us' for t in times[layout]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Payload size and encode/decode time of the list_stadiums response formats.
+
+Compares the default JSON body with MessagePack and the columnar layout
+(one array per field) of both.
+
+    python benchmarks/bench_response_formats.py [rows]
+"""
+
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stadiapi.settings')
+
+import django
+
+django.setup()
+
+from ninja.responses import NinjaJSONEncoder
+
+from stadiapp.renderers import msgpack, msgpack_default, to_columns
+
+
+def best(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    if msgpack is None:
+        sys.exit('msgpack is not installed')
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rows = [
+        {'id': i, 'name': f'Stadium {i}', 'sport': 'Football', 'city': f'City {i % 500}',
+         'state': f'State {i % 50}', 'capacity': 1000 + i % 100000}
+        for i in range(count)
+    ]
+    columns = to_columns(rows)
+
+    formats = [
+        ('json', rows, lambda data: json.dumps(data, cls=NinjaJSONEncoder).encode(), json.loads),
+        ('json columnar', columns, lambda data: json.dumps(data, cls=NinjaJSONEncoder).encode(), json.loads),
+        ('msgpack', rows, lambda data: msgpack.packb(data, default=msgpack_default), msgpack.unpackb),
+        ('msgpack columnar', columns, lambda data: msgpack.packb(data, default=msgpack_default), msgpack.unpackb),
+    ]
+    print(f'list_stadiums body with {count} stadiums')
+    print(f'{"format":<18} {"bytes":>10} {"encode ms":>10} {"decode ms":>10}')
+    for label, data, encode, decode in formats:
+        body = encode(data)
+        encode_time = best(lambda: encode(data))
+        decode_time = best(lambda: decode(body))
+        print(f'{label:<18} {len(body):>10,} {encode_time * 1000:>10.1f} {decode_time * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Validation throughput of CreateStadiumSchema.
+
+Compares the previous schema (a ninja Schema with v1-style @validator hooks)
+with the current one, validating one payload at a time and as a batch.
+
+    python benchmarks/bench_schema_validation.py [rows]
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stadiapi.settings')
+
+import django
+
+django.setup()
+
+import warnings
+
+from ninja import Schema
+from pydantic import Field, TypeAdapter, validator
+
+from stadiapp.schemas import CreateStadiumSchema, validate_stadium_batch
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+
+    class LegacyCreateStadiumSchema(Schema):
+        name: str = Field(..., min_length=1, max_length=100)
+        sport: str = Field(..., min_length=1, max_length=100)
+        city: str = Field(..., min_length=1, max_length=100)
+        state: str = Field(..., min_length=1, max_length=100)
+        capacity: Optional[int] = Field(default=0, ge=0)
+
+        @validator('name')
+        def name_must_not_be_empty(cls, v):
+            if not v or not v.strip():
+                raise ValueError('Stadium name cannot be empty')
+            return v.strip()
+
+        @validator('capacity')
+        def capacity_must_be_realistic(cls, v):
+            if v is None:
+                return 0
+            if v > 200000:
+                raise ValueError('Capacity seems unrealistic (max 200,000)')
+            return v
+
+
+def best(func, repeat=5):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rows = [
+        {'name': f' Stadium {i} ', 'sport': 'Football', 'city': 'City', 'state': 'State', 'capacity': i % 100000}
+        for i in range(count)
+    ]
+    legacy_batch = TypeAdapter(list[LegacyCreateStadiumSchema])
+
+    results = [
+        ('legacy, one at a time', best(lambda: [LegacyCreateStadiumSchema(**row) for row in rows])),
+        ('legacy, TypeAdapter batch', best(lambda: legacy_batch.validate_python(rows))),
+        ('current, one at a time', best(lambda: [CreateStadiumSchema(**row) for row in rows])),
+        ('current, validate_stadium_batch', best(lambda: validate_stadium_batch(rows))),
+    ]
+    print(f'Validating {count} stadium payloads')
+    for label, seconds in results:
+        print(f'{label:<34} {seconds * 1000:8.1f} ms {count / seconds:12,.0f} rows/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+SQLite concurrency with and without the tuned connection profile.
+
+Starts several worker processes, like gunicorn workers, that run a mix of
+reads and writes through the ORM against a scratch copy of the database for
+a fixed time, then reports throughput and "database is locked" failures.
+
+    python benchmarks/bench_sqlite_concurrency.py [workers] [seconds] [write_percent]
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(db_path, tuned):
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'stadiapi.settings'
+    os.environ['DATABASE_ENGINE'] = 'sqlite3'
+    os.environ['DATABASE_NAME'] = db_path
+    os.environ['SQLITE_TUNED'] = '1' if tuned else '0'
+    import django
+    django.setup()
+
+
+def prepare(db_path, tuned, rows=5000):
+    setup_django(db_path, tuned)
+    from django.core.management import call_command
+    from stadiapp.models import City, Sport, Stadium, State
+    call_command('migrate', verbosity=0)
+    # bulk_create() skips save(), so lookup rows are passed instead of names.
+    refs = dict(sport_ref=Sport.lookup('Football'), city_ref=City.lookup('City'), state_ref=State.lookup('State'))
+    Stadium.objects.bulk_create(
+        Stadium(name=f'Seed {i}', capacity=i, **refs)
+        for i in range(rows)
+    )
+
+
+def worker(db_path, tuned, seconds, write_percent, worker_id, results):
+    setup_django(db_path, tuned)
+    from django.db import OperationalError, transaction
+    from stadiapp.models import Stadium, StadiumChange
+
+    reads = writes = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            if random.randrange(100) < write_percent:
+                with transaction.atomic():
+                    stadium = Stadium.objects.create(
+                        name=f'Worker {worker_id} {writes}', sport='Football', city='City', state='State'
+                    )
+                    StadiumChange.record(stadium.id, StadiumChange.UPSERT)
+                writes += 1
+            else:
+                Stadium.objects.filter(id=random.randrange(1, 5000)).first()
+                list(Stadium.objects.all()[:50])
+                reads += 1
+        except OperationalError:
+            errors += 1
+        latencies.append(time.monotonic() - started)
+    latencies.sort()
+    results.put((reads, writes, errors, latencies[int(len(latencies) * 0.99)] if latencies else 0))
+
+
+def run(tuned, workers, seconds, write_percent):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.sqlite3')
+        ctx = multiprocessing.get_context('spawn')
+        setup = ctx.Process(target=prepare, args=(db_path, tuned))
+        setup.start()
+        setup.join()
+
+        results = ctx.Queue()
+        processes = [
+            ctx.Process(target=worker, args=(db_path, tuned, seconds, write_percent, i, results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    reads = sum(t[0] for t in totals)
+    writes = sum(t[1] for t in totals)
+    errors = sum(t[2] for t in totals)
+    p99 = max(t[3] for t in totals)
+    label = 'tuned (WAL, IMMEDIATE)' if tuned else 'SQLite defaults'
+    print(f'{label:<24} {reads / seconds:9.0f} reads/s {writes / seconds:8.0f} writes/s '
+          f'{errors:6d} locked errors   p99 {p99 * 1000:7.1f} ms')
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    write_percent = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    print(f'{workers} workers, {seconds:g}s, {write_percent}% writes')
+    run(False, workers, seconds, write_percent)
+    run(True, workers, seconds, write_percent)
+
+
+if __name__ == '__main__':
+    main()
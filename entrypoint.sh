@@ -12,5 +12,5 @@ if [ $# -gt 0 ]; then
 else
     # No arguments provided, run the default Django/Gunicorn server
     echo "No arguments provided, starting Gunicorn server..."
-    exec gunicorn --bind 0.0.0.0:8000 --workers 3 stadiapi.wsgi:application
+    exec gunicorn -c /app/gunicorn.conf.py stadiapi.wsgi:application
 fi
\ No newline at end of file
@@ -0,0 +1,59 @@
+"""Gunicorn settings for the WSGI replicas.
+
+Workers are recycled before their memory grows without bound:
+
+* after GUNICORN_MAX_REQUESTS requests, plus up to GUNICORN_MAX_REQUESTS_JITTER
+  more so the workers of a container do not all restart at once;
+* when a worker's RSS passes GUNICORN_MAX_WORKER_RSS_MB after a request. Freed
+  heap is first handed back to the OS with malloc_trim, and the worker is only
+  replaced if that does not bring it under the limit.
+
+Requests that cause the growth are reported by the memory telemetry
+middleware (/api/memory).
+"""
+import ctypes
+import ctypes.util
+import os
+import sys
+
+# The config file is loaded before gunicorn changes into the app directory.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stadiapp.memory import rss_bytes  # noqa: E402
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 3))
+# Threads make these gthread workers, so each process runs several requests at
+# once and admission control's ADMISSION_MAX_INFLIGHT (8 by default, 4 for list
+# calls) sheds load before every thread is busy, keeping threads free for
+# cheap requests.
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+MAX_WORKER_RSS = int(os.getenv("GUNICORN_MAX_WORKER_RSS_MB", 512)) * 1024 * 1024
+
+try:
+    malloc_trim = ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim
+except (OSError, AttributeError, TypeError):  # not glibc
+    malloc_trim = None
+
+
+def post_request(worker, req, environ, resp):
+    if not MAX_WORKER_RSS:
+        return
+    rss = rss_bytes()
+    if rss is None or rss <= MAX_WORKER_RSS:
+        return
+    if malloc_trim is not None:
+        malloc_trim(0)
+        rss = rss_bytes()
+        if rss <= MAX_WORKER_RSS:
+            return
+    worker.log.warning(
+        "Worker %s RSS %.0f MB is over %.0f MB after %s %s, recycling",
+        worker.pid, rss / 2**20, MAX_WORKER_RSS / 2**20, req.method, req.path,
+    )
+    # Finish this request, then exit; the arbiter starts a fresh worker.
+    worker.alive = False
@@ -44,10 +44,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'stadiapp.middleware.AdmissionControlMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'stadiapp.middleware.ProfilingMiddleware',
+    'stadiapp.middleware.MemoryTelemetryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -88,6 +91,112 @@ DATABASES = {
      }
 }
 
+# Fail fast when Postgres is unreachable so readiness probes and requests
+# do not hang on the default TCP connect timeout.
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['OPTIONS'] = {
+        'connect_timeout': int(os.getenv('DATABASE_CONNECT_TIMEOUT', 3)),
+    }
+
+# SQLite performance profile, applied to every new connection. WAL lets readers
+# run alongside the single writer, and BEGIN IMMEDIATE takes the write lock at
+# the start of a transaction so concurrent writers wait on busy_timeout instead
+# of failing with "database is locked" when upgrading a read lock.
+# Set SQLITE_TUNED=0 to fall back to SQLite's defaults.
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and int(os.getenv('SQLITE_TUNED', 1)):
+    DATABASES['default']['OPTIONS'] = {
+        'transaction_mode': 'IMMEDIATE',
+        'init_command': ';'.join([
+            'PRAGMA journal_mode=WAL',
+            'PRAGMA synchronous=NORMAL',
+            'PRAGMA busy_timeout={}'.format(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+            'PRAGMA mmap_size={}'.format(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+            'PRAGMA cache_size={}'.format(os.getenv('SQLITE_CACHE_SIZE', -64000)),
+            'PRAGMA temp_store=MEMORY',
+        ]),
+    }
+
+
+# Admission control
+# Requests are refused with a 503 and Retry-After once a worker is running
+# ADMISSION_MAX_INFLIGHT requests or a request waited longer than
+# ADMISSION_MAX_QUEUE_WAIT_MS in the proxy (measured from X-Request-Start).
+# A limit of 0 disables that check. The in-flight limit is per process and
+# needs threaded workers (GUNICORN_THREADS in gunicorn.conf.py) to be reached;
+# keep it below the thread count.
+
+ADMISSION_CONTROL_ENABLED = bool(int(os.getenv("ADMISSION_CONTROL_ENABLED", 1)))
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", 8))
+ADMISSION_MAX_QUEUE_WAIT_MS = int(os.getenv("ADMISSION_MAX_QUEUE_WAIT_MS", 5000))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 2))
+# Health probes are never shed, so an overloaded worker is not reported dead.
+ADMISSION_EXEMPT_ROUTES = ["up", "ready"]
+
+
+# Readiness
+# /up is liveness and never touches the database. /ready checks the database
+# and caches the result for READINESS_CACHE_SECONDS in each worker.
+
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", 2))
+
+
+# Staff access
+# Operational endpoints (profiles) accept this token in the X-Staff-Token
+# header, or a logged-in staff user. Empty disables token access.
+
+STAFF_TOKEN = os.getenv("STADIA_STAFF_TOKEN", "")
+
+
+# Request profiling
+# With PROFILING_ENABLED, staff can profile a single request by sending
+# "X-Profile: cprofile" (pstats) or "X-Profile: sample" (collapsed stacks for
+# flamegraphs). PROFILING_SAMPLE_RATES profiles a fraction of the requests of
+# a route, given as method and url name like admission control's routes, e.g.
+# "GET:list_stadiums=0.01,PUT:get_stadium=0.001" (ninja names every method on
+# stadiums/{id} get_stadium). Only the newest PROFILING_MAX_FILES profiles are
+# kept; download them from /api/profiles.
+
+PROFILING_ENABLED = bool(int(os.getenv("PROFILING_ENABLED", 0)))
+PROFILING_MODE = os.getenv("PROFILING_MODE", "cprofile")
+PROFILING_SAMPLE_RATES = {
+    tuple(route.split(":", 1)): float(rate)
+    for route, rate in (
+        item.split("=") for item in os.getenv("PROFILING_SAMPLE_RATES", "").split(",") if item
+    )
+}
+PROFILING_SAMPLE_INTERVAL = float(os.getenv("PROFILING_SAMPLE_INTERVAL", 0.001))
+PROFILING_DIR = os.getenv("PROFILING_DIR", BASE_DIR / "profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", 50))
+
+
+# Memory telemetry
+# Each worker records per route how much its RSS grew during requests. A
+# MEMORY_TRACE_RATE fraction of requests also measure their peak Python
+# allocation with tracemalloc; MEMORY_TRACEMALLOC_FRAMES > 0 traces every
+# request (slower, more memory) and enables /api/memory/snapshot. Requests
+# over MEMORY_REQUEST_BUDGET_MB are logged. Worker recycling on memory use is
+# configured in gunicorn.conf.py.
+
+MEMORY_TELEMETRY_ENABLED = bool(int(os.getenv("MEMORY_TELEMETRY_ENABLED", 1)))
+MEMORY_REQUEST_BUDGET_MB = float(os.getenv("MEMORY_REQUEST_BUDGET_MB", 32))
+MEMORY_TRACE_RATE = float(os.getenv("MEMORY_TRACE_RATE", 0))
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv("MEMORY_TRACEMALLOC_FRAMES", 0))
+
+
+# Change events
+# /api/stadiums/events streams stadium changes as server-sent events; serve it
+# from an ASGI worker. EVENTS_BACKEND carries events to the streaming
+# processes: LocalBackend works within one process, PostgresBackend uses
+# LISTEN/NOTIFY across processes. Subscribers that fall EVENTS_QUEUE_SIZE
+# events behind are disconnected and resume from the change log.
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "stadiapp.events.LocalBackend")
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", 1000))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", 15))
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", 2000))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -17,8 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 from stadiapp.api import api
+from stadiapp import views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path("api/stadiums/events", views.stadium_events, name="stadium_events"),
     path("api/", api.urls),
+    path("up", views.up, name="up"),
+    path("ready", views.ready, name="ready"),
 ]
@@ -1,25 +1,69 @@
-from ninja import NinjaAPI
-from .models import Stadium
-from .schemas import StadiumSchema, CreateStadiumSchema
+from .renderers import StadiaAPI, NegotiatingParser, NegotiatingRenderer
+from .models import City, Sport, Stadium, StadiumChange, State
+from .schemas import StadiumSchema, CreateStadiumSchema, StadiumChangesSchema, ProfileSchema, MemoryStatsSchema, AllocationSchema
+from .auth import staff_only
+from . import events, memory, profiling
+from django.http import FileResponse, HttpResponse
 from django.shortcuts import get_object_or_404 
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Subquery
 from ninja.errors import HttpError
+from typing import Literal, Optional
 
-api = NinjaAPI(version='1.0.0')
+api = StadiaAPI(version='1.0.0', renderer=NegotiatingRenderer(), parser=NegotiatingParser())
 
 @api.get("/stadiums", response=list[StadiumSchema])
-def list_stadiums(request):
+def list_stadiums(request, response: HttpResponse, sport: Optional[str] = None, city: Optional[str] = None, state: Optional[str] = None,
+                  order_by: Optional[str] = None, after: Optional[str] = None, limit: Optional[int] = None):
+    """List stadiums, optionally filtered, sorted and limited.
+
+    order_by is one of name, capacity, city or state, prefixed with "-" for
+    descending. When more rows follow a limited page, X-Next-Cursor holds the
+    value to pass as `after` for the next one.
+    """
     stadiums =Stadium.objects.all()
-    return stadiums
+    # Filters compare the integer key with the id looked up by name in a
+    # subquery, which the database evaluates once, so an index on
+    # (key, sort key) also returns the rows already sorted.
+    if sport is not None:
+        stadiums = stadiums.filter(sport_ref=Subquery(Sport.objects.filter(name=sport).values('id')))
+    if city is not None:
+        stadiums = stadiums.filter(city_ref=Subquery(City.objects.filter(name=city).values('id')))
+    if state is not None:
+        stadiums = stadiums.filter(state_ref=Subquery(State.objects.filter(name=state).values('id')))
+    if order_by is None and after is None and limit is None:
+        return stadiums
+    if limit is not None:
+        limit = max(1, min(limit, 5000))
+    try:
+        page, cursor = stadiums.sorted_page(order_by or "id", after, limit)
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
+    if cursor is not None:
+        response["X-Next-Cursor"] = cursor
+    return page
 
 @api.post("/stadiums", response=StadiumSchema)
 def create_stadium(request, payload: CreateStadiumSchema):
     try:
-        stadium = Stadium.objects.create(**payload.dict())
+        with transaction.atomic():
+            stadium = Stadium.objects.create(**payload.to_model_fields())
+            changes = StadiumChange.record(stadium.id, StadiumChange.UPSERT)
+            events.publish_change(changes[0], stadium)
     except IntegrityError:
         raise HttpError(400, "A stadium with this name already exists.")
     return stadium
 
+@api.get("/stadiums/changes", response=StadiumChangesSchema)
+def stadium_changes(request, since: int = 0, limit: int = 500):
+    """Inserts, updates and deletes after the `since` cursor, oldest first.
+
+    Start with since=0 for a full copy, then pass back the returned cursor.
+    Deleted stadiums come back as tombstones with op "delete" and no data.
+    """
+    limit = max(1, min(limit, 5000))
+    return StadiumChange.page(since, limit)
+
 @api.get("stadiums/{stadium_id}", response=StadiumSchema)
 def get_stadium(request, stadium_id: int):
     stadium = get_object_or_404(Stadium, id=stadium_id)
@@ -28,20 +72,52 @@ def get_stadium(request, stadium_id: int):
 @api.put("stadiums/{stadium_id}", response=StadiumSchema)
 def update_stadium(request, stadium_id: int, payload: CreateStadiumSchema):
     try:
-        stadium = get_object_or_404(Stadium, id=stadium_id)
-        for attr, value in payload.dict().items():
-            setattr(stadium, attr, value)
-        stadium.save()
+        with transaction.atomic():
+            stadium = get_object_or_404(Stadium, id=stadium_id)
+            for attr, value in payload.to_model_fields().items():
+                setattr(stadium, attr, value)
+            stadium.save()
+            changes = StadiumChange.record(stadium.id, StadiumChange.UPSERT)
+            events.publish_change(changes[0], stadium)
     except IntegrityError:
         raise HttpError(400, "Stadium capacity must be greater than 0")
     return stadium
 
 @api.delete("stadiums/{stadium_id}")
 def delete_stadium(request, stadium_id: int):
-    stadium = get_object_or_404(Stadium, id=stadium_id)
-    stadium.delete()
+    with transaction.atomic():
+        stadium = get_object_or_404(Stadium, id=stadium_id)
+        stadium.delete()
+        changes = StadiumChange.record(stadium_id, StadiumChange.DELETE)
+        events.publish_change(changes[0])
     return {"success": True}
 
 @api.get("/healthcheck")
 def health_check(request):
     return {"status": "ok"}
+
+@api.get("/profiles", response=list[ProfileSchema], auth=staff_only)
+def list_profiles(request):
+    """Stored request profiles, newest first (see PROFILING_ENABLED)."""
+    return profiling.list_profiles()
+
+@api.get("/profiles/{name}", auth=staff_only)
+def download_profile(request, name: str):
+    """Download a .pstats file (pstats, snakeviz) or .collapsed stacks (flamegraph.pl, speedscope)."""
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HttpError(404, "Profile not found.")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
+
+@api.get("/memory", response=MemoryStatsSchema, auth=staff_only)
+def memory_stats(request):
+    """Memory use per route of the worker that serves this request; pid tells workers apart."""
+    return memory.stats.as_dict()
+
+@api.get("/memory/snapshot", response=list[AllocationSchema], auth=staff_only)
+def memory_snapshot(request, limit: int = 25, group_by: Literal["lineno", "filename"] = "lineno"):
+    """Largest live allocations of this worker, traced by tracemalloc."""
+    allocations = memory.top_allocations(max(1, min(limit, 500)), group_by)
+    if allocations is None:
+        raise HttpError(409, "tracemalloc is not tracing; set MEMORY_TRACEMALLOC_FRAMES.")
+    return allocations
@@ -0,0 +1,29 @@
+import hmac
+
+from django.conf import settings
+from ninja.security import APIKeyHeader, django_auth_is_staff
+
+
+def is_staff_token(key):
+    token = settings.STAFF_TOKEN
+    return bool(token) and bool(key) and hmac.compare_digest(key, token)
+
+
+def has_staff_access(request):
+    """True for requests carrying the staff token or made by a staff user."""
+    if is_staff_token(request.headers.get(StaffTokenAuth.param_name)):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_staff)
+
+
+class StaffTokenAuth(APIKeyHeader):
+    param_name = 'X-Staff-Token'
+
+    def authenticate(self, request, key):
+        if is_staff_token(key):
+            return key
+
+
+# Operational endpoints accept either the staff token header or a staff session.
+staff_only = [StaffTokenAuth(), django_auth_is_staff]
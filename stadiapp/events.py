@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+from ninja.responses import NinjaJSONEncoder
+
+from .models import StadiumChange
+from .schemas import StadiumSchema
+
+logger = logging.getLogger(__name__)
+
+# Postgres NOTIFY channel used by PostgresBackend.
+CHANNEL = 'stadia_changes'
+
+
+class Subscription:
+    """One SSE client: a bounded queue on the event loop serving it."""
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on self.loop. A client that cannot keep up is cut off with a
+        # None marker; it reconnects with Last-Event-ID and replays from the
+        # change log instead of holding an unbounded backlog here.
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.disconnect()
+
+    def disconnect(self):
+        # Runs on self.loop. Drops what is queued and ends the stream.
+        self.overflowed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Broadcaster:
+    """In-process fan-out of change events to SSE subscribers.
+
+    publish() may be called from any thread; each event is handed to the
+    subscriber's own event loop. An idle subscriber is just a queue and a
+    suspended coroutine.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def subscribe(self, maxsize):
+        subscription = Subscription(asyncio.get_running_loop(), maxsize)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, event):
+        self.notify('deliver', event)
+
+    def disconnect_all(self):
+        """End every current stream; clients reconnect and replay what they missed."""
+        self.notify('disconnect')
+
+    def notify(self, method, *args):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(getattr(subscription, method), *args)
+            except RuntimeError:  # the subscriber's loop is closed
+                self.unsubscribe(subscription)
+
+
+class LocalBackend:
+    """Deliver events to subscribers in this process when the write commits.
+
+    Enough for a single ASGI process. With several processes use a backend
+    that crosses process boundaries, such as PostgresBackend.
+    """
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+
+    def publish(self, event):
+        transaction.on_commit(lambda: self.broadcaster.publish(event))
+
+    def start(self):
+        pass
+
+
+class PostgresBackend(LocalBackend):
+    """Fan out across processes with Postgres LISTEN/NOTIFY.
+
+    NOTIFY is transactional, so every process receives an event only if and
+    when the write commits. Each process serving subscribers runs one
+    listener thread with its own connection.
+    """
+
+    def __init__(self, broadcaster):
+        super().__init__(broadcaster)
+        self.started = False
+        self.start_lock = threading.Lock()
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, json.dumps(event, cls=NinjaJSONEncoder)])
+
+    def start(self):
+        with self.start_lock:
+            if not self.started:
+                threading.Thread(target=self.listen, name='stadia-events', daemon=True).start()
+                self.started = True
+
+    def listen(self):
+        wrapper = connections['default']
+        while True:
+            conn = None
+            try:
+                conn = wrapper.get_new_connection(wrapper.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                while True:
+                    select.select([conn], [], [], 5)
+                    conn.poll()
+                    while conn.notifies:
+                        self.broadcaster.publish(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception('Change event listener failed, reconnecting')
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                # Notifications sent until LISTEN is back are lost; subscribers
+                # reconnect with Last-Event-ID and replay them from the log.
+                self.broadcaster.disconnect_all()
+                time.sleep(1)
+
+
+broadcaster = Broadcaster()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.EVENTS_BACKEND)(broadcaster)
+        return _backend
+
+
+def serialize_change(seq, op, stadium_id, stadium):
+    return {
+        'seq': seq,
+        'op': op,
+        'id': stadium_id,
+        'stadium': StadiumSchema.from_orm(stadium).model_dump() if stadium is not None else None,
+    }
+
+
+def publish_change(change, stadium=None):
+    """Publish a change recorded by StadiumChange.record; call inside its transaction."""
+    get_backend().publish(serialize_change(change.seq, change.op, change.stadium_id, stadium))
+
+
+def replay_page(since):
+    try:
+        page = StadiumChange.page(since, 500)
+        page['changes'] = [
+            serialize_change(c['seq'], c['op'], c['id'], c['stadium']) for c in page['changes']
+        ]
+        return page
+    finally:
+        # Under ASGI this runs in the request's own thread, whose connection
+        # would otherwise stay open until the stream ends; an idle subscriber
+        # must not hold a database connection.
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def format_event(event):
+    data = json.dumps(event, cls=NinjaJSONEncoder)
+    return f"id: {event['seq']}\nevent: {event['op']}\ndata: {data}\n\n"
+
+
+async def stream(since=None):
+    """Server-sent events for stadium changes.
+
+    With `since` (the client's Last-Event-ID) the changes it missed are
+    replayed from the change log before live events, so reconnecting clients
+    lose nothing.
+    """
+    get_backend().start()
+    subscription = broadcaster.subscribe(settings.EVENTS_QUEUE_SIZE)
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        replayed_until = None
+        if since is not None:
+            replayed_until = since
+            while True:
+                page = await sync_to_async(replay_page)(replayed_until)
+                for event in page['changes']:
+                    yield format_event(event)
+                replayed_until = page['cursor']
+                if not page['has_more']:
+                    break
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), settings.EVENTS_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is None:
+                break
+            if replayed_until is not None and event['seq'] <= replayed_until:
+                continue
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,206 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from pydantic import ValidationError
+
+from stadiapp.models import City, Sport, Stadium, StadiumChange, State
+from stadiapp.schemas import validate_stadium_batch
+
+COLUMNS = ['name', 'sport_ref_id', 'city_ref_id', 'state_ref_id', 'capacity']
+LOOKUPS = [('sport', Sport), ('city', City), ('state', State)]
+
+
+class MalformedRecord:
+    """A line that could not be parsed; rejected in validate() like an invalid row."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk import stadiums from a CSV or NDJSON file, merging on name. '
+        'Uses COPY through a staging table on Postgres and batched executemany on SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or NDJSON file with one stadium per line')
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help='Input format, guessed from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Rows validated and committed per transaction (default: 10000)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Skip the rows committed by a previous interrupted run')
+        parser.add_argument('--checkpoint',
+                            help='Progress file used by --resume (default: <path>.progress)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1')
+        checkpoint = options['checkpoint'] or f'{path}.progress'
+
+        done = self.read_checkpoint(checkpoint) if options['resume'] else 0
+        if done:
+            self.stdout.write(f'Resuming after {done} rows')
+
+        write_batch = self.write_postgres if connection.vendor == 'postgresql' else self.write_sqlite
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            self.relax_sqlite()
+
+        imported = rejected = 0
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as f:
+            records = islice(self.read_records(f, fmt), done, None)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                rows, errors = self.validate(batch, first_row=done + 1)
+                for error in errors[:10]:
+                    self.stderr.write(error)
+                with transaction.atomic():
+                    if rows:
+                        write_batch(self.resolve_lookups(rows))
+                done += len(batch)
+                imported += len(rows)
+                rejected += len(errors)
+                self.write_checkpoint(checkpoint, done)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{done} rows read, {imported} imported, {rejected} rejected '
+                    f'({imported / elapsed if elapsed else 0:.0f} rows/s)'
+                )
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        # Refresh planner statistics after a bulk load. SQLite has no
+        # autovacuum to do it and without them it may join the lookup tables
+        # in an order that sorts the whole table for order_by=city.
+        if imported:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} stadiums, rejected {rejected} rows'))
+
+    def read_records(self, f, fmt):
+        if fmt == 'csv':
+            for record in csv.DictReader(f):
+                if record.get('capacity') == '':
+                    record['capacity'] = None
+                yield record
+        else:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield MalformedRecord(f'invalid JSON: {exc}')
+
+    def validate(self, batch, first_row):
+        """Validate a batch with validate_stadium_batch in a single call.
+
+        Returns the rows to write, deduplicated on name with the last row
+        winning, and error messages for the rows that were rejected.
+        """
+        bad = {
+            index: [record.error] for index, record in enumerate(batch) if isinstance(record, MalformedRecord)
+        }
+        # (index in batch, record) of the rows that were parsed.
+        parsed = [(index, record) for index, record in enumerate(batch) if index not in bad]
+        try:
+            valid = validate_stadium_batch([record for _, record in parsed])
+        except ValidationError as exc:
+            invalid = set()
+            for error in exc.errors():
+                position = error['loc'][0]
+                invalid.add(position)
+                field = '.'.join(str(part) for part in error['loc'][1:])
+                bad.setdefault(parsed[position][0], []).append(f"{field}: {error['msg']}")
+            valid = validate_stadium_batch(
+                [record for position, (_, record) in enumerate(parsed) if position not in invalid]
+            )
+        errors = [f'Row {first_row + index}: ' + '; '.join(msgs) for index, msgs in sorted(bad.items())]
+        rows = {}
+        for stadium in valid:
+            data = stadium.to_model_fields()
+            rows[data['name']] = data
+        return list(rows.values()), errors
+
+    def resolve_lookups(self, rows):
+        """Replace sport, city and state names with lookup ids, as COLUMNS tuples."""
+        ids = {field: model.ids_for(row[field] for row in rows) for field, model in LOOKUPS}
+        return [
+            (row['name'], ids['sport'][row['sport']], ids['city'][row['city']],
+             ids['state'][row['state']], row['capacity'])
+            for row in rows
+        ]
+
+    def relax_sqlite(self):
+        # The import is resumable, so durability of each batch is not worth an
+        # fsync; a crash just repeats the batches after the last checkpoint.
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA temp_store = MEMORY')
+            cursor.execute('PRAGMA cache_size = -200000')
+
+    def write_sqlite(self, rows):
+        table = Stadium._meta.db_table
+        updates = ', '.join(f'{column} = excluded.{column}' for column in COLUMNS[1:])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} ({", ".join(COLUMNS)}) VALUES (%s, %s, %s, %s, %s) '
+                f'ON CONFLICT (name) DO UPDATE SET {updates}',
+                rows,
+            )
+        names = [row[0] for row in rows]
+        stadium_ids = []
+        # Stay below SQLite's limit on bound parameters.
+        for i in range(0, len(names), 500):
+            stadium_ids += Stadium.objects.filter(name__in=names[i:i + 500]).values_list('id', flat=True)
+        StadiumChange.record(stadium_ids, StadiumChange.UPSERT)
+
+    def write_postgres(self, rows):
+        table = Stadium._meta.db_table
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in COLUMNS[1:])
+        copy_sql = f'COPY stadium_import ({", ".join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE IF NOT EXISTS stadium_import '
+                '(name varchar(100), sport_ref_id bigint, city_ref_id bigint, state_ref_id bigint, capacity integer) '
+                'ON COMMIT DELETE ROWS'
+            )
+            if hasattr(cursor.cursor, 'copy_expert'):
+                cursor.cursor.copy_expert(copy_sql, buffer)
+            else:
+                with cursor.cursor.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(COLUMNS)}) '
+                f'SELECT {", ".join(COLUMNS)} FROM stadium_import '
+                f'ON CONFLICT (name) DO UPDATE SET {updates} RETURNING id'
+            )
+            stadium_ids = [row[0] for row in cursor.fetchall()]
+        StadiumChange.record(stadium_ids, StadiumChange.UPSERT)
+
+    def read_checkpoint(self, checkpoint):
+        if not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            return json.load(f)['rows']
+
+    def write_checkpoint(self, checkpoint, rows):
+        with open(checkpoint, 'w') as f:
+            json.dump({'rows': rows}, f)
@@ -0,0 +1,88 @@
+import os
+import threading
+import tracemalloc
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryStats:
+    """Memory use of the requests served by this worker, per route."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.over_budget = 0
+            self.routes = {}
+
+    def record(self, method, route, rss_growth, peak, over_budget):
+        with self.lock:
+            self.requests += 1
+            self.over_budget += over_budget
+            stats = self.routes.setdefault((method, route), {
+                'method': method,
+                'route': route,
+                'requests': 0,
+                'traced': 0,
+                'over_budget': 0,
+                'max_peak': 0,
+                'max_rss_growth': 0,
+            })
+            stats['requests'] += 1
+            stats['over_budget'] += over_budget
+            if peak is not None:
+                stats['traced'] += 1
+                stats['max_peak'] = max(stats['max_peak'], peak)
+            if rss_growth is not None:
+                stats['max_rss_growth'] = max(stats['max_rss_growth'], rss_growth)
+
+    def as_dict(self):
+        with self.lock:
+            routes = sorted(
+                (dict(stats) for stats in self.routes.values()),
+                key=lambda stats: stats['max_peak'],
+                reverse=True,
+            )
+            return {
+                'pid': os.getpid(),
+                'rss': rss_bytes(),
+                'tracing': tracemalloc.is_tracing(),
+                'requests': self.requests,
+                'over_budget': self.over_budget,
+                'routes': routes,
+            }
+
+
+stats = MemoryStats()
+
+
+def top_allocations(limit, group_by='lineno'):
+    """Largest live allocations traced by tracemalloc, or None if it is not tracing."""
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ])
+    allocations = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frame = stat.traceback[0]
+        allocations.append({
+            'file': frame.filename,
+            'line': frame.lineno,
+            'size': stat.size,
+            'count': stat.count,
+        })
+    return allocations
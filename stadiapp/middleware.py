@@ -0,0 +1,299 @@
+import cProfile
+import logging
+import random
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from . import memory
+from .auth import has_staff_access
+from .profiling import StackSampler, save_profile
+
+logger = logging.getLogger(__name__)
+
+# Routes are classified by (method, url name). Ninja names each path after the
+# first view registered on it, so "stadiums/{id}" is "get_stadium" for every
+# method and the method is needed to tell reads from writes.
+CHEAP_ROUTES = {
+    ("GET", "get_stadium"),
+    ("GET", "health_check"),
+}
+EXPENSIVE_ROUTES = {
+    ("GET", "list_stadiums"),
+}
+
+# Share of the configured limits each route class may use before it is shed.
+# Cheap reads keep being served after the expensive list calls are refused.
+PRIORITY_FACTORS = {
+    "cheap": 2.0,
+    "default": 1.0,
+    "expensive": 0.5,
+}
+
+
+def parse_request_start(value):
+    """Parse an X-Request-Start header into a unix timestamp in seconds.
+
+    nginx sends "t=${msec}" (seconds with millisecond resolution); other proxies
+    send milliseconds or microseconds, which are told apart by magnitude.
+    """
+    if not value:
+        return None
+    if value.startswith("t="):
+        value = value[2:]
+    try:
+        started = float(value)
+    except ValueError:
+        return None
+    if started > 1e14:
+        return started / 1e6
+    if started > 1e11:
+        return started / 1e3
+    return started
+
+
+class AdmissionControlMiddleware:
+    """Shed load with a fast 503 instead of letting requests queue until the
+    proxy times out.
+
+    Two signals are checked before a request is admitted: the number of
+    requests already running in this worker process and how long the request
+    waited in nginx and the gunicorn backlog, taken from X-Request-Start.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.inflight = 0
+
+    def __call__(self, request):
+        priority = self.classify(request)
+        if priority is None:
+            return self.get_response(request)
+
+        factor = PRIORITY_FACTORS[priority]
+        max_wait = settings.ADMISSION_MAX_QUEUE_WAIT_MS * factor
+        if max_wait and self.queue_wait_ms(request) > max_wait:
+            return self.reject()
+
+        max_inflight = settings.ADMISSION_MAX_INFLIGHT * factor
+        with self.lock:
+            if max_inflight and self.inflight >= max_inflight:
+                admitted = False
+            else:
+                admitted = True
+                self.inflight += 1
+        if not admitted:
+            return self.reject()
+
+        try:
+            return self.get_response(request)
+        finally:
+            with self.lock:
+                self.inflight -= 1
+
+    def classify(self, request):
+        """Return the priority class of a request, or None if it is exempt."""
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            return None
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return "default"
+        if url_name in settings.ADMISSION_EXEMPT_ROUTES:
+            return None
+        route = (request.method, url_name)
+        if route in CHEAP_ROUTES:
+            return "cheap"
+        if route in EXPENSIVE_ROUTES:
+            return "expensive"
+        return "default"
+
+    def queue_wait_ms(self, request):
+        started = parse_request_start(request.headers.get("X-Request-Start"))
+        if started is None:
+            return 0
+        return max(0, (time.time() - started) * 1000)
+
+    def reject(self):
+        response = JsonResponse(
+            {"detail": "Service is overloaded, please retry later."}, status=503
+        )
+        response["Retry-After"] = str(settings.ADMISSION_RETRY_AFTER)
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile live requests on demand.
+
+    A request is profiled when it sends an X-Profile header ("cprofile" or
+    "sample") and has staff access, or when its (method, url name) is picked
+    by PROFILING_SAMPLE_RATES. Profiles are stored with bounded retention and
+    their name is returned in X-Profile-Id. When PROFILING_ENABLED is off the
+    middleware removes itself from the chain at startup.
+
+    Only one profiler can be active in a process (since Python 3.12 enabling a
+    second one raises), so while one request is under cProfile the requests
+    overlapping it are profiled with the per-thread stack sampler instead.
+    """
+
+    MODES = ("cprofile", "sample")
+    cprofile_lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode, label = self.profile_mode(request)
+        if mode is None:
+            return self.get_response(request)
+        if mode == "cprofile" and self.cprofile_lock.acquire(blocking=False):
+            try:
+                response, name = self.cprofile(request, label)
+            finally:
+                self.cprofile_lock.release()
+        else:
+            response, name = self.sample(request, label)
+        response["X-Profile-Id"] = name
+        return response
+
+    def profile_mode(self, request):
+        requested = request.headers.get("X-Profile")
+        rates = settings.PROFILING_SAMPLE_RATES
+        if not requested and not rates:
+            return None, None
+        try:
+            url_name = resolve(request.path_info).url_name or "request"
+        except Resolver404:
+            url_name = "request"
+        # The method is part of the label since writes share the url name of reads.
+        label = f"{request.method.lower()}-{url_name}"
+        if requested and has_staff_access(request):
+            mode = requested if requested in self.MODES else settings.PROFILING_MODE
+            return mode, label
+        rate = rates.get((request.method, url_name))
+        if rate and random.random() < rate:
+            return settings.PROFILING_MODE, label
+        return None, None
+
+    def cprofile(self, request, label):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return response, save_profile(label, ".pstats", profiler.dump_stats)
+
+    def sample(self, request, label):
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        return response, save_profile(
+            label, ".collapsed", lambda path: path.write_text(sampler.collapsed())
+        )
+
+
+class MemoryTelemetryMiddleware:
+    """Record how much memory each request uses, per route.
+
+    Every request records the growth of this worker's RSS. A fraction of
+    requests (MEMORY_TRACE_RATE) is also traced with tracemalloc to measure
+    its peak Python allocation; with MEMORY_TRACEMALLOC_FRAMES tracing runs
+    all the time, every request is eligible and /api/memory/snapshot can list
+    the largest live allocations. Both RSS and tracemalloc's peak are
+    process-wide, so they include whatever other threads allocate meanwhile.
+    A peak is therefore only kept when no other request ran in the worker
+    during the traced one; requests that overlap record RSS growth only,
+    which is an upper bound. Requests over MEMORY_REQUEST_BUDGET_MB (peak
+    allocation, or RSS growth when not traced) are logged as warnings. The
+    results of a worker, per method and url name, are served at /api/memory.
+    """
+
+    def __init__(self, get_response):
+        if not settings.MEMORY_TELEMETRY_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Held by the one request whose peak allocation is being measured.
+        self.trace_lock = threading.Lock()
+        # Requests running in this worker, and how many have started so far,
+        # to tell whether a traced request ran alone.
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.arrivals = 0
+        if settings.MEMORY_TRACEMALLOC_FRAMES and not tracemalloc.is_tracing():
+            tracemalloc.start(settings.MEMORY_TRACEMALLOC_FRAMES)
+        self.continuous = tracemalloc.is_tracing()
+
+    def __call__(self, request):
+        with self.lock:
+            self.inflight += 1
+            self.arrivals += 1
+        try:
+            rss_before = memory.rss_bytes()
+            wants_trace = self.continuous or (
+                settings.MEMORY_TRACE_RATE
+                and random.random() < settings.MEMORY_TRACE_RATE
+            )
+            if wants_trace and self.trace_lock.acquire(blocking=False):
+                response, peak = self.traced(request)
+            else:
+                response, peak = self.get_response(request), None
+            rss_after = memory.rss_bytes()
+        finally:
+            with self.lock:
+                self.inflight -= 1
+        rss_growth = rss_after - rss_before if rss_after is not None else None
+        self.record(request, rss_after, rss_growth, peak)
+        return response
+
+    def traced(self, request):
+        """Run the request under tracemalloc and return it with its peak.
+
+        The peak is None when another request ran meanwhile. The caller holds
+        trace_lock; it is released here once tracing started for this request
+        has been stopped again.
+        """
+        started = not tracemalloc.is_tracing()
+        try:
+            if started:
+                tracemalloc.start()
+            with self.lock:
+                alone = self.inflight == 1
+                arrivals = self.arrivals
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            response = self.get_response(request)
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            with self.lock:
+                alone = alone and self.arrivals == arrivals
+            return response, peak if alone else None
+        finally:
+            if started:
+                tracemalloc.stop()
+            self.trace_lock.release()
+
+    def record(self, request, rss, rss_growth, peak):
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else "unresolved"
+        used = peak if peak is not None else rss_growth
+        budget = settings.MEMORY_REQUEST_BUDGET_MB * 1024 * 1024
+        over_budget = bool(budget and used is not None and used > budget)
+        memory.stats.record(request.method, route, rss_growth, peak, over_budget)
+        if over_budget:
+            logger.warning(
+                "%s %s used %.1f MB (%s), over the %g MB budget; worker RSS %.1f MB",
+                request.method, route, used / 2**20,
+                "peak allocation" if peak is not None else "RSS growth",
+                settings.MEMORY_REQUEST_BUDGET_MB, (rss or 0) / 2**20,
+            )
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+def backfill_changes(apps, schema_editor):
+    Stadium = apps.get_model('stadiapp', 'Stadium')
+    StadiumChange = apps.get_model('stadiapp', 'StadiumChange')
+    stadium_ids = Stadium.objects.order_by('id').values_list('id', flat=True).iterator()
+    StadiumChange.objects.bulk_create(
+        (StadiumChange(stadium_id=stadium_id, op='upsert') for stadium_id in stadium_ids),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stadiapp', '0003_alter_stadium_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StadiumChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stadium_id', models.BigIntegerField(db_index=True)),
+                ('op', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['seq'],
+            },
+        ),
+        migrations.RunPython(backfill_changes, migrations.RunPython.noop),
+    ]
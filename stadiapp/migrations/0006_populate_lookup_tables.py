@@ -0,0 +1,32 @@
+from django.db import migrations
+
+LOOKUPS = [('sport', 'Sport'), ('city', 'City'), ('state', 'State')]
+
+
+def populate_lookups(apps, schema_editor):
+    Stadium = apps.get_model('stadiapp', 'Stadium')
+    for field, model_name in LOOKUPS:
+        Lookup = apps.get_model('stadiapp', model_name)
+        for name in Stadium.objects.values_list(field, flat=True).distinct().iterator():
+            # get_or_create: rows survive a migration back to 0005.
+            lookup, _ = Lookup.objects.get_or_create(name=name)
+            Stadium.objects.filter(**{field: name}).update(**{f'{field}_ref': lookup})
+
+
+def restore_columns(apps, schema_editor):
+    Stadium = apps.get_model('stadiapp', 'Stadium')
+    for field, model_name in LOOKUPS:
+        Lookup = apps.get_model('stadiapp', model_name)
+        for lookup in Lookup.objects.iterator():
+            Stadium.objects.filter(**{f'{field}_ref': lookup}).update(**{field: lookup.name})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stadiapp', '0005_lookup_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_lookups, restore_columns),
+    ]
@@ -0,0 +1,52 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stadiapp', '0006_populate_lookup_tables'),
+    ]
+
+    operations = [
+        # A default lets the columns be re-added when migrating backwards;
+        # 0006 then fills them in from the lookup tables. It only has to be in
+        # the migration state, so no table is rebuilt for it going forwards.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='stadium',
+                    name=field,
+                    field=models.CharField(default='', max_length=100),
+                )
+                for field in ('city', 'sport', 'state')
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='stadium',
+            name='city',
+        ),
+        migrations.RemoveField(
+            model_name='stadium',
+            name='sport',
+        ),
+        migrations.RemoveField(
+            model_name='stadium',
+            name='state',
+        ),
+        migrations.AlterField(
+            model_name='stadium',
+            name='city_ref',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stadiums', to='stadiapp.city'),
+        ),
+        migrations.AlterField(
+            model_name='stadium',
+            name='sport_ref',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stadiums', to='stadiapp.sport'),
+        ),
+        migrations.AlterField(
+            model_name='stadium',
+            name='state_ref',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stadiums', to='stadiapp.state'),
+        ),
+    ]
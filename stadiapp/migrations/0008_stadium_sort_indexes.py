@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_capacity(apps, schema_editor):
+    Stadium = apps.get_model('stadiapp', 'Stadium')
+    Stadium.objects.filter(capacity__isnull=True).update(capacity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stadiapp', '0007_remove_stadium_text_columns'),
+    ]
+
+    operations = [
+        # capacity becomes NOT NULL so it sorts and compares like any other
+        # key; a missing capacity was already stored as 0 by the API.
+        migrations.RunPython(fill_capacity, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='stadium',
+            name='capacity',
+            field=models.IntegerField(blank=True, default=0),
+        ),
+        # Build the composite indexes before dropping the foreign key indexes
+        # they replace.
+        migrations.AddIndex(
+            model_name='stadium',
+            index=models.Index(fields=['capacity', 'id'], name='stadium_capacity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stadium',
+            index=models.Index(fields=['city_ref', 'id'], name='stadium_city_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stadium',
+            index=models.Index(fields=['state_ref', 'id'], name='stadium_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stadium',
+            index=models.Index(fields=['sport_ref', 'capacity', 'id'], name='stadium_sport_capacity_idx'),
+        ),
+        migrations.AlterField(
+            model_name='stadium',
+            name='city_ref',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='stadiums', to='stadiapp.city'),
+        ),
+        migrations.AlterField(
+            model_name='stadium',
+            name='sport_ref',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='stadiums', to='stadiapp.sport'),
+        ),
+        migrations.AlterField(
+            model_name='stadium',
+            name='state_ref',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='stadiums', to='stadiapp.state'),
+        ),
+    ]
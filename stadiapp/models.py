@@ -1,13 +1,266 @@
-from django.db import models
+import base64
+import json
+from operator import attrgetter
+
+from django.db import connection, models
+from django.db.models import Q
 
 # Create your models here.
 
+class Lookup(models.Model):
+    """Name table referenced by stadiums through a compact integer key."""
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def lookup(cls, name):
+        return cls.objects.get_or_create(name=name)[0]
+
+    @classmethod
+    def ids_for(cls, names):
+        """Map names to ids, creating the missing rows."""
+        names = list(set(names))
+        ids = {}
+        # Stay below SQLite's limit on bound parameters.
+        for i in range(0, len(names), 500):
+            ids.update(cls.objects.filter(name__in=names[i:i + 500]).values_list('name', 'id'))
+        missing = [name for name in names if name not in ids]
+        if missing:
+            cls.objects.bulk_create([cls(name=name) for name in missing], ignore_conflicts=True)
+            for i in range(0, len(missing), 500):
+                ids.update(cls.objects.filter(name__in=missing[i:i + 500]).values_list('name', 'id'))
+        return ids
+
+
+class Sport(Lookup):
+    pass
+
+
+class City(Lookup):
+    class Meta:
+        verbose_name_plural = 'cities'
+
+
+class State(Lookup):
+    pass
+
+
+def lookup_name(ref):
+    """Property reading and writing the lookup foreign key `ref` by name.
+
+    A plain property, so Stadium(sport='Baseball') and objects.create() keep
+    accepting names. Assigning a name runs no query; Stadium.save() resolves
+    it to its lookup row.
+    """
+    pending = f'_{ref}_name'
+
+    def get(self):
+        if pending in self.__dict__:
+            return self.__dict__[pending]
+        if getattr(self, f'{ref}_id') is None:
+            return None
+        return getattr(self, ref).name
+
+    def set(self, value):
+        self.__dict__[pending] = value
+
+    return property(get, set)
+
+
+# Sort orders accepted by list_stadiums. Each is walked in order through an
+# index (see Stadium.Meta.indexes), so a LIMIT reads only the rows it returns.
+# Non-unique keys end with id to make the order total, which lets a keyset
+# cursor resume after any row. id is the default when only a limit is given.
+STADIUM_ORDERINGS = {
+    'id': ('id',),
+    'name': ('name',),
+    'capacity': ('capacity', 'id'),
+    'city': ('city_ref__name', 'id'),
+    'state': ('state_ref__name', 'id'),
+}
+
+
+def encode_cursor(order_by, values):
+    data = json.dumps([order_by, *values]).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order_by, size):
+    """Return the key values stored in `cursor`; ValueError if it is not one for `order_by`."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Malformed cursor')
+    if (not isinstance(data, list) or len(data) != size + 1 or data[0] != order_by
+            or not all(isinstance(value, (int, str)) for value in data[1:])):
+        raise ValueError(f'Cursor does not belong to order_by={order_by}')
+    return data[1:]
+
+
+def keyset_after(keys, values, descending):
+    """Filter for rows after `values` in the order of `keys`.
+
+    (k1, k2) > (v1, v2) is spelled k1 > v1 OR (k1 = v1 AND k2 > v2). The extra
+    k1 >= v1 bound lets the database start the index scan at the cursor.
+    """
+    op = 'lt' if descending else 'gt'
+    after = Q()
+    for i, key in enumerate(keys):
+        after |= Q(**dict(zip(keys[:i], values[:i])), **{f'{key}__{op}': values[i]})
+    return Q(**{f'{keys[0]}__{op}e': values[0]}) & after
+
+
+class StadiumQuerySet(models.QuerySet):
+    def sorted_page(self, order_by, after=None, limit=None):
+        """Stadiums in `order_by` order ("capacity", "-capacity", ...) after a cursor.
+
+        Returns (stadiums, cursor), where cursor resumes after the last stadium
+        and is None when nothing follows. Raises ValueError for an unknown
+        order or a cursor that does not belong to it.
+        """
+        descending = order_by.startswith('-')
+        keys = STADIUM_ORDERINGS.get(order_by[1:] if descending else order_by)
+        if keys is None:
+            raise ValueError(f'Cannot order by {order_by!r}')
+        stadiums = self.order_by(*(('-' if descending else '') + key for key in keys))
+        if after is not None:
+            values = decode_cursor(after, order_by, len(keys))
+            stadiums = stadiums.filter(keyset_after(keys, values, descending))
+        if limit is None:
+            return list(stadiums), None
+        page = list(stadiums[:limit + 1])
+        if len(page) <= limit:
+            return page, None
+        page = page[:limit]
+        last = page[-1]
+        values = [attrgetter(key.replace('__', '.'))(last) for key in keys]
+        return page, encode_cursor(order_by, values)
+
+
+class StadiumManager(models.Manager.from_queryset(StadiumQuerySet)):
+    def get_queryset(self):
+        # Lookup names come back in the same query, so responses stay one query.
+        return super().get_queryset().select_related('sport_ref', 'city_ref', 'state_ref')
+
+
 class Stadium(models.Model):
     name = models.CharField(max_length=100, unique=True)
-    sport = models.CharField(max_length=100)
-    city = models.CharField(max_length=100)
-    state = models.CharField(max_length=100)
-    capacity = models.IntegerField(null=True, blank=True, default=0)
+    # The composite indexes below lead with these keys and replace the
+    # single-column foreign key indexes.
+    sport_ref = models.ForeignKey(Sport, on_delete=models.PROTECT, related_name='stadiums', db_index=False)
+    city_ref = models.ForeignKey(City, on_delete=models.PROTECT, related_name='stadiums', db_index=False)
+    state_ref = models.ForeignKey(State, on_delete=models.PROTECT, related_name='stadiums', db_index=False)
+    capacity = models.IntegerField(blank=True, default=0)
+
+    objects = StadiumManager()
+
+    class Meta:
+        # Index-ordered scans for STADIUM_ORDERINGS. name is covered by its
+        # unique index. (sport_ref, capacity, id) answers "largest stadiums of
+        # a sport" without sorting.
+        indexes = [
+            models.Index(fields=['capacity', 'id'], name='stadium_capacity_idx'),
+            models.Index(fields=['city_ref', 'id'], name='stadium_city_idx'),
+            models.Index(fields=['state_ref', 'id'], name='stadium_state_idx'),
+            models.Index(fields=['sport_ref', 'capacity', 'id'], name='stadium_sport_capacity_idx'),
+        ]
+
+    sport = lookup_name('sport_ref')
+    city = lookup_name('city_ref')
+    state = lookup_name('state_ref')
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.resolve_lookups()
+        super().save(*args, **kwargs)
+
+    def resolve_lookups(self):
+        """Point the lookup keys at the rows for names assigned since the last save.
+
+        A name equal to the loaded lookup's costs nothing; otherwise its row is
+        fetched or created, one query per lookup. bulk_create() does not call
+        this, so pass lookup ids there.
+        """
+        for field_name in ('sport_ref', 'city_ref', 'state_ref'):
+            pending = f'_{field_name}_name'
+            if pending not in self.__dict__:
+                continue
+            name = self.__dict__[pending]
+            field = self._meta.get_field(field_name)
+            current = getattr(self, field_name) if field.is_cached(self) else None
+            if current is None or current.name != name:
+                setattr(self, field_name, field.related_model.lookup(name))
+            del self.__dict__[pending]
+
+class StadiumChange(models.Model):
+    """Change log used for delta sync.
+
+    Only the latest change of each stadium is kept, so the log holds one row
+    per live stadium plus one tombstone per deleted stadium, and reading it
+    from a cursor costs what changed since, not the size of the catalog.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OP_CHOICES = [(UPSERT, 'Upsert'), (DELETE, 'Delete')]
+
+    seq = models.BigAutoField(primary_key=True)
+    stadium_id = models.BigIntegerField(db_index=True)
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f'{self.seq} {self.op} {self.stadium_id}'
+
+    @classmethod
+    def record(cls, stadium_ids, op):
+        """Record a change for the given stadiums, replacing earlier entries.
+
+        Must run inside the transaction that writes the stadiums. On Postgres
+        change-log writers are serialized with an advisory lock so sequence
+        numbers become visible in commit order and a client cursor never skips
+        a change that commits late.
+        """
+        if isinstance(stadium_ids, int):
+            stadium_ids = [stadium_ids]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGE_LOG_LOCK_ID])
+        cls.objects.filter(stadium_id__in=stadium_ids).delete()
+        return cls.objects.bulk_create(cls(stadium_id=stadium_id, op=op) for stadium_id in stadium_ids)
+
+    @classmethod
+    def page(cls, since, limit):
+        """Changes after the `since` cursor, oldest first, with their stadiums.
+
+        Returns {"cursor", "has_more", "changes"}, where each change is a dict
+        with "seq", "op", "id" and "stadium" (None for tombstones).
+        """
+        changes = list(cls.objects.filter(seq__gt=since)[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        stadiums = Stadium.objects.in_bulk(
+            [change.stadium_id for change in changes if change.op == cls.UPSERT]
+        )
+        results = []
+        for change in changes:
+            stadium = stadiums.get(change.stadium_id)
+            if change.op == cls.UPSERT and stadium is None:
+                # Deleted after this page was read; its tombstone has a later seq.
+                continue
+            results.append({'seq': change.seq, 'op': change.op, 'id': change.stadium_id, 'stadium': stadium})
+        cursor = changes[-1].seq if changes else since
+        return {'cursor': cursor, 'has_more': has_more, 'changes': results}
+
+
+# Arbitrary key for pg_advisory_xact_lock, unique within this database.
+CHANGE_LOG_LOCK_ID = 0x5374616469
@@ -0,0 +1,96 @@
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILE_NAME = re.compile(r'^[\w.-]+\.(pstats|collapsed)$')
+
+
+class StackSampler:
+    """Statistical profiler for one thread.
+
+    A background thread records the target thread's call stack every
+    `interval` seconds. The result is in the collapsed-stack format read by
+    flamegraph.pl and speedscope: one "outer;...;inner count" line per stack.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.counts.most_common())
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def save_profile(label, suffix, write):
+    """Store a profile under a unique name and enforce retention.
+
+    `write` is called with the destination path. Returns the profile name.
+    """
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    name = f'{stamp}-{label}-{uuid.uuid4().hex[:8]}{suffix}'
+    write(directory / name)
+    prune()
+    return name
+
+
+def list_profiles():
+    """Stored profiles, newest first."""
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in directory.iterdir():
+        if PROFILE_NAME.match(path.name):
+            stat = path.stat()
+            profiles.append({
+                'name': path.name,
+                'size': stat.st_size,
+                'created': datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            })
+    return sorted(profiles, key=lambda profile: profile['created'], reverse=True)
+
+
+def profile_path(name):
+    """Path of a stored profile, or None if there is no profile by that name."""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = profile_dir() / name
+    return path if path.is_file() else None
+
+
+def prune():
+    for profile in list_profiles()[settings.PROFILING_MAX_FILES:]:
+        (profile_dir() / profile['name']).unlink(missing_ok=True)
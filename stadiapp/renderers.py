@@ -0,0 +1,155 @@
+import json
+import typing
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.utils.cache import patch_vary_headers
+from ninja import NinjaAPI
+from ninja.parser import Parser
+from ninja.renderers import JSONRenderer
+
+try:
+    import msgpack
+except ImportError:  # MessagePack support is optional
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+
+
+def parse_accept(header):
+    """Parse an Accept header into (media_type, params, q) tuples, best first."""
+    accepted = []
+    for position, item in enumerate(header.split(",")):
+        media_type, *raw_params = [part.strip() for part in item.split(";")]
+        if not media_type:
+            continue
+        params = {}
+        for raw in raw_params:
+            key, _, value = raw.partition("=")
+            params[key.strip().lower()] = value.strip().strip('"')
+        try:
+            q = float(params.pop("q", 1))
+        except ValueError:
+            q = 0
+        accepted.append((q, -position, media_type.lower(), params))
+    accepted.sort(reverse=True)
+    return [(media_type, params, q) for q, _, media_type, params in accepted if q > 0]
+
+
+def negotiate(request):
+    """Pick the response format for a request.
+
+    Returns (media_type, columnar). MessagePack is offered when msgpack is
+    installed; "layout=columnar" on either type asks for list responses as
+    one array per field.
+    """
+    cached = getattr(request, "_negotiated_format", None)
+    if cached:
+        return cached
+    result = (JSON, False)
+    for media_type, params, q in parse_accept(request.headers.get("Accept", "")):
+        columnar = params.get("layout") == "columnar"
+        if media_type in MSGPACK_ALIASES and msgpack is not None:
+            result = (MSGPACK, columnar)
+            break
+        if media_type in (JSON, "application/*", "*/*"):
+            result = (JSON, columnar)
+            break
+    request._negotiated_format = result
+    return result
+
+
+def list_item_fields(request, status):
+    """Field names of the items of the list the operation declares for `status`.
+
+    Returns None when the request was not routed to a ninja operation or its
+    response is not a list of schemas.
+    """
+    view = getattr(request.resolver_match, "func", None)
+    path_view = getattr(view, "__self__", None)
+    for operation in getattr(path_view, "operations", ()):
+        if request.method not in operation.methods:
+            continue
+        model = operation.response_models.get(status) or operation.response_models.get(Ellipsis)
+        field = getattr(model, "model_fields", {}).get("response")
+        if field is None or typing.get_origin(field.annotation) is not list:
+            return None
+        (item,) = typing.get_args(field.annotation)
+        return list(getattr(item, "model_fields", {})) or None
+    return None
+
+
+def to_columns(data, fields=None):
+    """Turn a list of objects into one list per field: {"id": [...], ...}.
+
+    An empty list has no objects to take the keys from, so they come from
+    `fields`; without them the list is returned unchanged.
+    """
+    if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+        return data
+    if not data:
+        return {key: [] for key in fields} if fields else data
+    columns = {}
+    for item in data:
+        for key in item:
+            columns.setdefault(key, [])
+    for item in data:
+        for key, values in columns.items():
+            values.append(item.get(key))
+    return columns
+
+
+def msgpack_default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (Decimal, UUID)):
+        return str(obj)
+    raise TypeError(f"Cannot serialize {type(obj).__name__} to MessagePack")
+
+
+class NegotiatingRenderer(JSONRenderer):
+    """Render JSON or MessagePack according to the Accept header."""
+
+    def render(self, request, data, *, response_status):
+        media_type, columnar = negotiate(request)
+        if columnar:
+            fields = list_item_fields(request, response_status) if data == [] else None
+            data = to_columns(data, fields)
+        if media_type == MSGPACK:
+            return msgpack.packb(data, default=msgpack_default, use_bin_type=True)
+        return super().render(request, data, response_status=response_status)
+
+    def content_type(self, request):
+        media_type, columnar = negotiate(request)
+        if media_type == MSGPACK:
+            return f"{MSGPACK}; layout=columnar" if columnar else MSGPACK
+        suffix = "; layout=columnar" if columnar else ""
+        return f"{JSON}; charset={self.charset}{suffix}"
+
+
+class NegotiatingParser(Parser):
+    """Parse JSON or, with a MessagePack Content-Type, MessagePack request bodies."""
+
+    def parse_body(self, request):
+        content_type = request.content_type or ""
+        if content_type.lower() in MSGPACK_ALIASES:
+            if msgpack is None:
+                raise ValueError("MessagePack support is not installed")
+            return msgpack.unpackb(request.body, raw=False)
+        return json.loads(request.body)
+
+
+class StadiaAPI(NinjaAPI):
+    """NinjaAPI whose responses carry the negotiated Content-Type."""
+
+    def create_response(self, request, data, *, status=None, temporal_response=None):
+        response = super().create_response(
+            request, data, status=status, temporal_response=temporal_response
+        )
+        if isinstance(self.renderer, NegotiatingRenderer):
+            response["Content-Type"] = self.renderer.content_type(request)
+            patch_vary_headers(response, ["Accept"])
+        return response
@@ -1,7 +1,7 @@
 from ninja import Schema
-from datetime import date
-from pydantic import validator, Field
-from typing import Optional
+from datetime import date, datetime
+from pydantic import BaseModel, Field, StringConstraints, TypeAdapter
+from typing import Annotated, Optional
 
 class StadiumSchema(Schema):
     id: int
@@ -11,27 +11,71 @@ class StadiumSchema(Schema):
     state: str
     capacity: Optional[int] = None
 
-class CreateStadiumSchema(Schema):
-    name: str = Field(..., min_length=1, max_length=100, description="Stadium name cannot be empty")
-    sport: str = Field(..., min_length=1, max_length=100)
-    city: str = Field(..., min_length=1, max_length=100)
-    state: str = Field(..., min_length=1, max_length=100)
-    capacity: Optional[int] = Field(default=0, ge=0, description="Capacity must be non-negative")
-    
-   
-    @validator('name')
-    def name_must_not_be_empty(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Stadium name cannot be empty')
-        return v.strip()
-   
-    @validator('capacity')
-    def capacity_must_be_realistic(cls, v):
-        if v is None:  # Allow None values
-            return 0  # Convert None to 0, or return v to keep as None
-        if v < 0:
-            raise ValueError('Capacity cannot be negative')
-        if v > 200000:  # upper limit
-            raise ValueError('Capacity seems unrealistic (max 200,000)')
-        return v  
+class StadiumChangeSchema(Schema):
+    seq: int
+    op: str
+    id: int
+    stadium: Optional[StadiumSchema] = None
+
+class StadiumChangesSchema(Schema):
+    cursor: int
+    has_more: bool
+    changes: list[StadiumChangeSchema]
+
+class ProfileSchema(Schema):
+    name: str
+    size: int
+    created: datetime
+
+class RouteMemorySchema(Schema):
+    method: str
+    route: str
+    requests: int
+    traced: int
+    over_budget: int
+    max_peak: int
+    max_rss_growth: int
+
+class MemoryStatsSchema(Schema):
+    pid: int
+    rss: Optional[int] = None
+    tracing: bool
+    requests: int
+    over_budget: int
+    routes: list[RouteMemorySchema]
+
+class AllocationSchema(Schema):
+    file: str
+    line: int
+    size: int
+    count: int
+
+StadiumName = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=100)]
+StadiumText = Annotated[str, StringConstraints(min_length=1, max_length=100)]
+Capacity = Annotated[int, Field(ge=0, le=200000)]
+
+# Input payloads are plain pydantic models: every rule below is a native
+# constraint, so validation runs entirely in pydantic-core. A ninja Schema would
+# add its Python wrap validator (used for reading Django objects) to every call.
+class CreateStadiumSchema(BaseModel):
+    name: StadiumName = Field(..., description="Stadium name cannot be empty")
+    sport: StadiumText
+    city: StadiumText
+    state: StadiumText
+    capacity: Optional[Capacity] = Field(default=0, description="Capacity must be between 0 and 200,000")
+
+    def to_model_fields(self):
+        """Field values for the Stadium model; a null capacity is stored as 0."""
+        data = self.model_dump()
+        if data['capacity'] is None:
+            data['capacity'] = 0
+        return data
+
+CreateStadiumListAdapter = TypeAdapter(list[CreateStadiumSchema])
+
+def validate_stadium_batch(rows):
+    """Validate many stadium payloads in a single pydantic-core call.
 
+    Raises ValidationError whose error locations start with the row index.
+    """
+    return CreateStadiumListAdapter.validate_python(rows)
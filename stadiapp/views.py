@@ -1,4 +1,81 @@
-from django.shortcuts import render
+import logging
+import threading
+import time
 
-# Create your views here.
-# Views here
\ No newline at end of file
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError, connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import events
+
+logger = logging.getLogger(__name__)
+
+_probe_lock = threading.Lock()
+_probe = {"checked_at": None, "ok": False}
+
+
+def up(request):
+    """Liveness: the process is serving requests. Never touches the database."""
+    return JsonResponse({"status": "ok"})
+
+
+def ready(request):
+    """Readiness: the database is reachable.
+
+    The probe result is cached for READINESS_CACHE_SECONDS per worker, so
+    frequent polling by the proxy and the container runtime costs at most one
+    `SELECT 1` per interval.
+    """
+    if not check_database():
+        return JsonResponse({"status": "unavailable", "database": "unavailable"}, status=503)
+    return JsonResponse({"status": "ok", "database": "ok"})
+
+
+def check_database():
+    """Return whether the database answered the last probe.
+
+    Failures are logged rather than returned: the endpoint is public and
+    database errors name the host and user.
+    """
+    now = time.monotonic()
+    with _probe_lock:
+        checked_at = _probe["checked_at"]
+        if checked_at is not None and now - checked_at < settings.READINESS_CACHE_SECONDS:
+            return _probe["ok"]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            ok = True
+        except DatabaseError:
+            logger.exception("Readiness probe could not reach the database")
+            ok = False
+        _probe["checked_at"] = time.monotonic()
+        _probe["ok"] = ok
+        return ok
+
+
+@require_GET
+async def stadium_events(request):
+    """Stream stadium changes as server-sent events.
+
+    Each event has the change log sequence number as its id, so a client that
+    reconnects with Last-Event-ID (or ?last_event_id= on the first connection)
+    gets the changes it missed before the live ones.
+
+    Only served under ASGI: a WSGI worker would buffer the endless stream and
+    be held until it is killed.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "The event stream is served by the ASGI service."}, status=503)
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        since = int(last_event_id) if last_event_id else None
+    except ValueError:
+        since = None
+    response = StreamingHttpResponse(events.stream(since), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Tell nginx not to buffer the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
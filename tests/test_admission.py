@@ -0,0 +1,68 @@
+from django.test import TestCase, Client, override_settings
+from stadiapp.middleware import AdmissionControlMiddleware, parse_request_start
+from stadiapp.models import Stadium
+import time
+
+class AdmissionControlTestCase(TestCase):
+    """Test load shedding in AdmissionControlMiddleware"""
+
+    def setUp(self):
+        self.client = Client()
+        self.stadium = Stadium.objects.create(
+            name='Fenway Park',
+            sport='Baseball',
+            city='Boston',
+            state='Massachusetts',
+            capacity=37755
+        )
+
+    def queued_for(self, seconds):
+        return f't={time.time() - seconds:.3f}'
+
+    def test_parse_request_start(self):
+        """Test X-Request-Start parsing for seconds, milliseconds and microseconds"""
+        self.assertEqual(parse_request_start('t=1700000000.123'), 1700000000.123)
+        self.assertEqual(parse_request_start('1700000000123'), 1700000000.123)
+        self.assertAlmostEqual(parse_request_start('1700000000123456'), 1700000000.123456)
+        self.assertIsNone(parse_request_start('garbage'))
+        self.assertIsNone(parse_request_start(None))
+
+    def test_fresh_request_is_admitted(self):
+        """Test requests without queueing delay are served"""
+        response = self.client.get('/api/stadiums', HTTP_X_REQUEST_START=self.queued_for(0))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(ADMISSION_MAX_QUEUE_WAIT_MS=1000)
+    def test_queued_list_request_is_shed(self):
+        """Test expensive list calls are refused with 503 and Retry-After"""
+        response = self.client.get('/api/stadiums', HTTP_X_REQUEST_START=self.queued_for(0.7))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(ADMISSION_MAX_QUEUE_WAIT_MS=1000)
+    def test_cheap_routes_have_priority(self):
+        """Test cheap routes are still served at a queue wait that sheds the list"""
+        start = self.queued_for(1.5)
+        response = self.client.get(f'/api/stadiums/{self.stadium.id}', HTTP_X_REQUEST_START=start)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/healthcheck', HTTP_X_REQUEST_START=start)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.delete(f'/api/stadiums/{self.stadium.id}', HTTP_X_REQUEST_START=start)
+        self.assertEqual(response.status_code, 503)
+
+    @override_settings(ADMISSION_MAX_INFLIGHT=2)
+    def test_inflight_limit(self):
+        """Test requests over the per-worker in-flight limit are refused"""
+        middleware = AdmissionControlMiddleware(lambda request: None)
+        middleware.inflight = 1
+        request = self.client.get('/api/healthcheck').wsgi_request
+        self.assertIsNone(middleware(request))
+        request = self.client.get('/api/stadiums').wsgi_request
+        self.assertEqual(middleware(request).status_code, 503)
+        self.assertEqual(middleware.inflight, 1)
+
+    @override_settings(ADMISSION_CONTROL_ENABLED=False, ADMISSION_MAX_QUEUE_WAIT_MS=1)
+    def test_disabled(self):
+        """Test nothing is shed when admission control is disabled"""
+        response = self.client.get('/api/stadiums', HTTP_X_REQUEST_START=self.queued_for(10))
+        self.assertEqual(response.status_code, 200)
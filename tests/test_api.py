@@ -1,6 +1,6 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
-from stadiapp.models import Stadium
+from stadiapp.models import City, Sport, Stadium, StadiumChange, State
 import json
 
 class StadiumAPITestCase(TestCase):
@@ -155,6 +155,77 @@ class StadiumAPITestCase(TestCase):
         data = response.json()
         self.assertEqual(data['status'], 'ok')
 
+class StadiumChangesTestCase(TestCase):
+    """Test the delta sync change log"""
+
+    def setUp(self):
+        self.client = Client()
+        self.payload = {
+            'name': 'Fenway Park',
+            'sport': 'Baseball',
+            'city': 'Boston',
+            'state': 'Massachusetts',
+            'capacity': 37755
+        }
+
+    def create(self, **overrides):
+        payload = dict(self.payload, **overrides)
+        response = self.client.post('/api/stadiums',
+                                   data=json.dumps(payload),
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['id']
+
+    def test_changes_full_copy(self):
+        """Test since=0 returns every stadium"""
+        self.create()
+        self.create(name='TD Garden')
+        response = self.client.get('/api/stadiums/changes?since=0')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([c['stadium']['name'] for c in data['changes']], ['Fenway Park', 'TD Garden'])
+        self.assertFalse(data['has_more'])
+
+    def test_changes_since_cursor(self):
+        """Test only updates and deletes after the cursor are returned"""
+        fenway = self.create()
+        garden = self.create(name='TD Garden')
+        cursor = self.client.get('/api/stadiums/changes').json()['cursor']
+
+        self.client.put(f'/api/stadiums/{fenway}',
+                        data=json.dumps(dict(self.payload, capacity=37800)),
+                        content_type='application/json')
+        self.client.delete(f'/api/stadiums/{garden}')
+
+        data = self.client.get(f'/api/stadiums/changes?since={cursor}').json()
+        self.assertEqual([(c['op'], c['id']) for c in data['changes']],
+                         [('upsert', fenway), ('delete', garden)])
+        self.assertEqual(data['changes'][0]['stadium']['capacity'], 37800)
+        self.assertIsNone(data['changes'][1]['stadium'])
+
+        data = self.client.get(f"/api/stadiums/changes?since={data['cursor']}").json()
+        self.assertEqual(data['changes'], [])
+
+    def test_changes_are_compacted(self):
+        """Test only the latest change of a stadium is kept"""
+        fenway = self.create()
+        for capacity in (1, 2, 3):
+            self.client.put(f'/api/stadiums/{fenway}',
+                            data=json.dumps(dict(self.payload, capacity=capacity)),
+                            content_type='application/json')
+        self.assertEqual(StadiumChange.objects.filter(stadium_id=fenway).count(), 1)
+
+    def test_changes_pagination(self):
+        """Test limit pages through the log with has_more"""
+        for i in range(3):
+            self.create(name=f'Stadium {i}')
+        data = self.client.get('/api/stadiums/changes?limit=2').json()
+        self.assertEqual(len(data['changes']), 2)
+        self.assertTrue(data['has_more'])
+        data = self.client.get(f"/api/stadiums/changes?since={data['cursor']}&limit=2").json()
+        self.assertEqual(len(data['changes']), 1)
+        self.assertFalse(data['has_more'])
+
 class StadiumModelTestCase(TestCase):
     """Unit tests for Stadium model"""
     
@@ -301,6 +372,75 @@ class StadiumFilteringTestCase(TestCase):
         for field in required_fields:
             self.assertIn(field, stadium)
 
+    def test_filter_by_sport(self):
+        """Test filtering stadiums by sport"""
+        response = self.client.get('/api/stadiums?sport=Baseball')
+        self.assertEqual(response.status_code, 200)
+        names = sorted(stadium['name'] for stadium in response.json())
+        self.assertEqual(names, ['Fenway Park', 'Yankee Stadium'])
+
+    def test_filter_by_city_and_state(self):
+        """Test combining city and state filters"""
+        response = self.client.get('/api/stadiums?city=Boston&state=Massachusetts')
+        names = sorted(stadium['name'] for stadium in response.json())
+        self.assertEqual(names, ['Fenway Park', 'TD Garden'])
+        response = self.client.get('/api/stadiums?city=Nowhere')
+        self.assertEqual(response.json(), [])
+
+    def test_lookup_values_are_shared(self):
+        """Test stadiums reference one lookup row per distinct value"""
+        self.assertEqual(Sport.objects.count(), 3)
+        self.assertEqual(City.objects.count(), 3)
+        self.assertEqual(State.objects.count(), 2)
+        fenway = Stadium.objects.get(name='Fenway Park')
+        garden = Stadium.objects.get(name='TD Garden')
+        self.assertEqual(fenway.city_ref_id, garden.city_ref_id)
+
+    def test_order_by(self):
+        """Test sorting by each whitelisted key, ascending and descending"""
+        response = self.client.get('/api/stadiums?order_by=-capacity')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([s['capacity'] for s in response.json()], [65878, 54251, 37755, 19580])
+        response = self.client.get('/api/stadiums?order_by=name')
+        self.assertEqual([s['name'] for s in response.json()],
+                         ['Fenway Park', 'Gillette Stadium', 'TD Garden', 'Yankee Stadium'])
+        response = self.client.get('/api/stadiums?order_by=city')
+        self.assertEqual([s['city'] for s in response.json()], ['Boston', 'Boston', 'Foxborough', 'New York'])
+        response = self.client.get('/api/stadiums?order_by=-state')
+        self.assertEqual([s['state'] for s in response.json()],
+                         ['New York', 'Massachusetts', 'Massachusetts', 'Massachusetts'])
+
+    def test_order_by_with_filter_and_limit(self):
+        """Test top-N within a filter"""
+        response = self.client.get('/api/stadiums?sport=Baseball&order_by=-capacity&limit=1')
+        self.assertEqual([s['name'] for s in response.json()], ['Yankee Stadium'])
+        self.assertIn('X-Next-Cursor', response)
+
+    def test_keyset_continuation(self):
+        """Test following X-Next-Cursor visits every stadium once, across ties"""
+        for order_by in ['state', '-state', 'capacity', '-name']:
+            with self.subTest(order_by=order_by):
+                expected = [s['id'] for s in self.client.get(f'/api/stadiums?order_by={order_by}').json()]
+                seen = []
+                url = f'/api/stadiums?order_by={order_by}&limit=2'
+                while True:
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    seen.extend(s['id'] for s in response.json())
+                    cursor = response.get('X-Next-Cursor')
+                    if cursor is None:
+                        break
+                    url = f'/api/stadiums?order_by={order_by}&limit=2&after={cursor}'
+                self.assertEqual(seen, expected)
+
+    def test_invalid_order_by(self):
+        """Test unknown sort keys and foreign cursors are rejected"""
+        self.assertEqual(self.client.get('/api/stadiums?order_by=id;drop').status_code, 400)
+        self.assertEqual(self.client.get('/api/stadiums?order_by=sport_ref__name').status_code, 400)
+        cursor = self.client.get('/api/stadiums?order_by=name&limit=1')['X-Next-Cursor']
+        self.assertEqual(self.client.get(f'/api/stadiums?order_by=capacity&after={cursor}').status_code, 400)
+        self.assertEqual(self.client.get('/api/stadiums?order_by=name&after=garbage').status_code, 400)
+
 class StadiumErrorHandlingTestCase(TestCase):
     """Test error handling scenarios"""
     
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+from asgiref.sync import sync_to_async
+from django.test import TestCase, Client, AsyncClient, override_settings
+from stadiapp import events
+from unittest import mock
+
+def parse(frame):
+    """Split an SSE frame into its fields"""
+    fields = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+class BroadcasterTestCase(TestCase):
+    """Test in-process fan-out to subscribers"""
+
+    async def test_publish_from_another_thread(self):
+        """Test events published from a worker thread reach every subscriber"""
+        broadcaster = events.Broadcaster()
+        first = broadcaster.subscribe(10)
+        second = broadcaster.subscribe(10)
+        thread = threading.Thread(target=broadcaster.publish, args=({'seq': 1},))
+        thread.start()
+        thread.join()
+        self.assertEqual(await asyncio.wait_for(first.queue.get(), 1), {'seq': 1})
+        self.assertEqual(await asyncio.wait_for(second.queue.get(), 1), {'seq': 1})
+
+    async def test_slow_subscriber_is_cut_off(self):
+        """Test a full queue is dropped and ends with a disconnect marker"""
+        broadcaster = events.Broadcaster()
+        subscription = broadcaster.subscribe(2)
+        for seq in range(5):
+            broadcaster.publish({'seq': seq})
+        await asyncio.sleep(0)
+        self.assertTrue(subscription.overflowed)
+        self.assertIsNone(await subscription.queue.get())
+        self.assertTrue(subscription.queue.empty())
+
+class PostgresBackendTestCase(TestCase):
+    """Test the LISTEN/NOTIFY listener"""
+
+    async def test_listener_failure_disconnects_subscribers(self):
+        """Test a lost LISTEN connection is closed and every stream is ended"""
+        broadcaster = events.Broadcaster()
+        subscription = broadcaster.subscribe(10)
+        broadcaster.publish({'seq': 1})
+        backend = events.PostgresBackend(broadcaster)
+        conn = mock.MagicMock()
+        conn.cursor.return_value.__enter__.return_value.execute.side_effect = Exception('gone')
+        wrapper = events.connections['default']
+        with mock.patch.object(wrapper, 'get_new_connection', return_value=conn), \
+                mock.patch.object(events.time, 'sleep', side_effect=KeyboardInterrupt), \
+                self.assertLogs('stadiapp.events', 'ERROR'):
+            with self.assertRaises(KeyboardInterrupt):
+                backend.listen()
+        conn.close.assert_called_once_with()
+        self.assertIsNone(await asyncio.wait_for(subscription.queue.get(), 1))
+        self.assertTrue(subscription.queue.empty())
+
+class StadiumEventsTestCase(TestCase):
+    """Test the server-sent events stream"""
+
+    def setUp(self):
+        self.client = Client()
+        self.payload = {
+            'name': 'Fenway Park',
+            'sport': 'Baseball',
+            'city': 'Boston',
+            'state': 'Massachusetts',
+            'capacity': 37755
+        }
+
+    def create(self, **overrides):
+        payload = dict(self.payload, **overrides)
+        response = self.client.post('/api/stadiums',
+                                   data=json.dumps(payload),
+                                   content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['id']
+
+    async def acreate(self, **overrides):
+        return await sync_to_async(self.create)(**overrides)
+
+    def test_writes_publish_on_commit(self):
+        """Test create, update and delete publish events once committed"""
+        with mock.patch.object(events.broadcaster, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                stadium_id = self.create()
+                self.client.put(f'/api/stadiums/{stadium_id}',
+                                data=json.dumps(dict(self.payload, capacity=37800)),
+                                content_type='application/json')
+                self.client.delete(f'/api/stadiums/{stadium_id}')
+        published = [call.args[0] for call in publish.call_args_list]
+        self.assertEqual([e['op'] for e in published], ['upsert', 'upsert', 'delete'])
+        self.assertEqual(published[1]['stadium']['capacity'], 37800)
+        self.assertIsNone(published[2]['stadium'])
+        self.assertLess(published[0]['seq'], published[1]['seq'])
+
+    def test_no_event_for_rolled_back_write(self):
+        """Test a rejected write publishes nothing"""
+        self.create()
+        with mock.patch.object(events.broadcaster, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/stadiums',
+                                            data=json.dumps(self.payload),
+                                            content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        publish.assert_not_called()
+
+    async def test_stream_headers(self):
+        """Test the stream is served as unbuffered text/event-stream"""
+        response = await AsyncClient().get('/api/stadiums/events')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['X-Accel-Buffering'], 'no')
+        content = aiter(response.streaming_content)
+        self.assertTrue((await anext(content)).startswith(b'retry: '))
+        await content.aclose()
+
+    def test_stream_refused_under_wsgi(self):
+        """Test WSGI workers refuse the stream instead of holding a worker"""
+        response = self.client.get('/api/stadiums/events')
+        self.assertEqual(response.status_code, 503)
+
+    async def test_replay_then_live(self):
+        """Test Last-Event-ID replays missed changes, then live events follow"""
+        fenway = await self.acreate()
+        garden = await self.acreate(name='TD Garden')
+        stream = events.stream(since=0)
+        self.assertTrue((await anext(stream)).startswith('retry: '))
+        replayed = [parse(await anext(stream)) for _ in range(2)]
+        self.assertEqual([e['data']['id'] for e in replayed], [fenway, garden])
+        self.assertEqual(replayed[0]['event'], 'upsert')
+
+        # A live event already covered by the replay is skipped.
+        events.broadcaster.publish({'seq': int(replayed[0]['id']), 'op': 'upsert', 'id': fenway, 'stadium': None})
+        events.broadcaster.publish({'seq': int(replayed[1]['id']) + 1, 'op': 'delete', 'id': fenway, 'stadium': None})
+        live = parse(await asyncio.wait_for(anext(stream), 1))
+        self.assertEqual(live['event'], 'delete')
+        self.assertEqual(live['id'], str(int(replayed[1]['id']) + 1))
+        await stream.aclose()
+        self.assertFalse(events.broadcaster.subscriptions)
+
+    @override_settings(EVENTS_KEEPALIVE_SECONDS=0.01)
+    async def test_replay_closes_connection(self):
+        """Test the replay releases its database connection before live events"""
+        await self.acreate()
+        stream = events.stream(since=0)
+        with mock.patch.object(events, 'connection', in_atomic_block=False) as connection:
+            await anext(stream)
+            self.assertEqual(parse(await anext(stream))['event'], 'upsert')
+            self.assertEqual(await anext(stream), ': keepalive\n\n')
+        connection.close.assert_called_once_with()
+        await stream.aclose()
+
+    @override_settings(EVENTS_KEEPALIVE_SECONDS=0.01)
+    async def test_keepalive(self):
+        """Test idle streams send keepalive comments"""
+        stream = events.stream()
+        await anext(stream)
+        self.assertEqual(await anext(stream), ': keepalive\n\n')
+        await stream.aclose()
@@ -0,0 +1,71 @@
+from django.test import TestCase, Client
+from stadiapp.models import Stadium
+from stadiapp.renderers import parse_accept, msgpack
+import json
+import unittest
+
+class ContentNegotiationTestCase(TestCase):
+    """Test Accept-driven response formats"""
+
+    def setUp(self):
+        self.client = Client()
+        Stadium.objects.create(name='Fenway Park', sport='Baseball', city='Boston', state='Massachusetts', capacity=37755)
+        Stadium.objects.create(name='TD Garden', sport='Basketball', city='Boston', state='Massachusetts', capacity=19580)
+
+    def test_parse_accept(self):
+        """Test Accept parsing orders by quality then position"""
+        accepted = parse_accept('application/json;q=0.5, application/msgpack; layout=columnar, text/html;q=0')
+        self.assertEqual(accepted, [
+            ('application/msgpack', {'layout': 'columnar'}, 1.0),
+            ('application/json', {}, 0.5),
+        ])
+
+    def test_json_is_default(self):
+        """Test JSON is returned without an Accept header"""
+        response = self.client.get('/api/stadiums')
+        self.assertTrue(response['Content-Type'].startswith('application/json'))
+        self.assertEqual(len(response.json()), 2)
+
+    def test_json_columnar(self):
+        """Test the columnar layout returns one array per field"""
+        response = self.client.get('/api/stadiums', HTTP_ACCEPT='application/json; layout=columnar')
+        self.assertIn('layout=columnar', response['Content-Type'])
+        data = json.loads(response.content)
+        self.assertEqual(data['name'], ['Fenway Park', 'TD Garden'])
+        self.assertEqual(data['capacity'], [37755, 19580])
+
+    def test_json_columnar_empty(self):
+        """Test an empty list still has every field in the columnar layout"""
+        response = self.client.get('/api/stadiums?city=Nowhere', HTTP_ACCEPT='application/json; layout=columnar')
+        data = json.loads(response.content)
+        self.assertEqual(data['name'], [])
+        self.assertEqual(set(data), {'id', 'name', 'sport', 'city', 'state', 'capacity'})
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_response(self):
+        """Test MessagePack responses for list, detail and errors"""
+        response = self.client.get('/api/stadiums', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertIn('Accept', response['Vary'])
+        data = msgpack.unpackb(response.content)
+        self.assertEqual([s['name'] for s in data], ['Fenway Park', 'TD Garden'])
+
+        response = self.client.get('/api/stadiums/999', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', msgpack.unpackb(response.content))
+
+        response = self.client.get('/api/stadiums', HTTP_ACCEPT='application/msgpack; layout=columnar')
+        self.assertEqual(msgpack.unpackb(response.content)['city'], ['Boston', 'Boston'])
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_request_body(self):
+        """Test creating a stadium from a MessagePack body"""
+        payload = {'name': 'Gillette Stadium', 'sport': 'Football', 'city': 'Foxborough',
+                   'state': 'Massachusetts', 'capacity': 65878}
+        response = self.client.post('/api/stadiums', data=msgpack.packb(payload),
+                                    content_type='application/msgpack', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(msgpack.unpackb(response.content)['name'], 'Gillette Stadium')
+
+        response = self.client.post('/api/stadiums', data=b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
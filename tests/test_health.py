@@ -0,0 +1,47 @@
+from django.db import DatabaseError
+from django.test import TestCase, Client, override_settings
+from stadiapp import views
+from unittest import mock
+
+class HealthEndpointsTestCase(TestCase):
+    """Test liveness and readiness endpoints"""
+
+    def setUp(self):
+        self.client = Client()
+        views._probe['checked_at'] = None
+
+    def test_liveness(self):
+        """Test /up answers without touching the database"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/up')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ok')
+
+    def test_readiness(self):
+        """Test /ready checks the database"""
+        response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['database'], 'ok')
+
+    @override_settings(READINESS_CACHE_SECONDS=60)
+    def test_readiness_probe_is_cached(self):
+        """Test repeated readiness polls reuse the cached probe"""
+        with self.assertNumQueries(1):
+            for _ in range(5):
+                self.assertEqual(self.client.get('/ready').status_code, 200)
+
+    def test_readiness_database_down(self):
+        """Test /ready returns 503 when the database is unreachable"""
+        with mock.patch('stadiapp.views.connection') as connection:
+            connection.cursor.side_effect = DatabaseError('connection to server at "db" (10.0.0.2), port 5432 failed')
+            with self.assertLogs('stadiapp.views', 'ERROR') as logs:
+                response = self.client.get('/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'unavailable', 'database': 'unavailable'})
+        self.assertIn('10.0.0.2', logs.output[0])
+
+    @override_settings(ADMISSION_MAX_QUEUE_WAIT_MS=1)
+    def test_health_probes_are_not_shed(self):
+        """Test admission control never refuses health probes"""
+        response = self.client.get('/ready', HTTP_X_REQUEST_START='t=1')
+        self.assertEqual(response.status_code, 200)
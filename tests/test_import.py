@@ -0,0 +1,72 @@
+from django.core.management import call_command
+from django.test import TestCase
+from stadiapp.models import Stadium, StadiumChange
+from io import StringIO
+import json
+import os
+import tempfile
+
+class ImportStadiumsCommandTestCase(TestCase):
+    """Test the import_stadiums management command"""
+
+    def write(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_stadiums', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv_merges_on_name(self):
+        """Test CSV import merges on name and rejects invalid rows"""
+        Stadium.objects.create(name='Fenway Park', sport='Baseball', city='Boston', state='Massachusetts', capacity=1)
+        path = self.write('.csv', (
+            'name,sport,city,state,capacity\n'
+            'Fenway Park,Baseball,Boston,Massachusetts,37755\n'
+            'TD Garden,Basketball,Boston,Massachusetts,\n'
+            ',Football,Nowhere,Nowhere,10\n'
+        ))
+        out, err = self.run_import(path)
+        self.assertIn('Row 3', err)
+        self.assertEqual(Stadium.objects.count(), 2)
+        self.assertEqual(Stadium.objects.get(name='Fenway Park').capacity, 37755)
+        self.assertEqual(Stadium.objects.get(name='TD Garden').capacity, 0)
+        self.assertEqual(StadiumChange.objects.count(), 2)
+
+    def test_import_ndjson(self):
+        """Test NDJSON import in several batches"""
+        lines = [json.dumps({'name': f'Stadium {i}', 'sport': 'Soccer', 'city': 'City', 'state': 'State', 'capacity': i})
+                 for i in range(5)]
+        path = self.write('.ndjson', '\n'.join(lines))
+        out, err = self.run_import(path, '--batch-size', '2')
+        self.assertIn('Imported 5 stadiums', out)
+        self.assertEqual(Stadium.objects.count(), 5)
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+    def test_import_ndjson_malformed_line(self):
+        """Test a line that is not JSON is rejected with its row number and the rest is imported"""
+        lines = [json.dumps({'name': f'Stadium {i}', 'sport': 'Soccer', 'city': 'City', 'state': 'State'})
+                 for i in range(4)]
+        lines.insert(2, '{"name": "Broken",')
+        path = self.write('.ndjson', '\n'.join(lines))
+        out, err = self.run_import(path, '--batch-size', '3')
+        self.assertIn('Row 3: invalid JSON', err)
+        self.assertIn('Imported 4 stadiums, rejected 1 rows', out)
+        self.assertEqual(Stadium.objects.count(), 4)
+        self.assertFalse(os.path.exists(f'{path}.progress'))
+
+    def test_import_resume(self):
+        """Test --resume skips the rows recorded in the checkpoint"""
+        lines = [json.dumps({'name': f'Stadium {i}', 'sport': 'Soccer', 'city': 'City', 'state': 'State'})
+                 for i in range(4)]
+        path = self.write('.ndjson', '\n'.join(lines))
+        checkpoint = f'{path}.progress'
+        self.addCleanup(lambda: os.path.exists(checkpoint) and os.remove(checkpoint))
+        with open(checkpoint, 'w') as f:
+            json.dump({'rows': 3}, f)
+        self.run_import(path, '--resume')
+        self.assertEqual(list(Stadium.objects.values_list('name', flat=True)), ['Stadium 3'])
@@ -0,0 +1,96 @@
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from stadiapp.middleware import MemoryTelemetryMiddleware
+from stadiapp.models import Stadium
+from stadiapp import memory
+import tracemalloc
+
+@override_settings(STAFF_TOKEN='secret')
+class MemoryTelemetryTestCase(TestCase):
+    """Test per-request memory telemetry"""
+
+    def setUp(self):
+        self.client = Client()
+        Stadium.objects.create(
+            name='Fenway Park',
+            sport='Baseball',
+            city='Boston',
+            state='Massachusetts',
+            capacity=37755
+        )
+        memory.stats.reset()
+
+    def stats(self):
+        response = self.client.get('/api/memory', HTTP_X_STAFF_TOKEN='secret')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_stats_require_staff(self):
+        """Test the memory endpoints are staff only"""
+        self.assertEqual(self.client.get('/api/memory').status_code, 401)
+        self.assertEqual(self.client.get('/api/memory/snapshot').status_code, 401)
+
+    def test_requests_recorded_per_route(self):
+        """Test each request is counted against its method and route with the worker RSS"""
+        stadium_id = Stadium.objects.get().id
+        self.client.get('/api/stadiums')
+        self.client.get('/api/stadiums')
+        self.client.get(f'/api/stadiums/{stadium_id}')
+        self.client.delete(f'/api/stadiums/{stadium_id}')
+        data = self.stats()
+        routes = {(route['method'], route['route']): route for route in data['routes']}
+        self.assertEqual(routes['GET', 'list_stadiums']['requests'], 2)
+        self.assertEqual(routes['GET', 'list_stadiums']['traced'], 0)
+        self.assertEqual(routes['GET', 'get_stadium']['requests'], 1)
+        self.assertEqual(routes['DELETE', 'get_stadium']['requests'], 1)
+        self.assertGreater(data['rss'], 0)
+
+    def test_over_budget_request_is_flagged(self):
+        """Test a traced request over the budget is logged and counted"""
+        with override_settings(MEMORY_TRACE_RATE=1.0, MEMORY_REQUEST_BUDGET_MB=0.0001):
+            with self.assertLogs('stadiapp.middleware', 'WARNING') as logs:
+                self.client.get('/api/stadiums')
+        self.assertIn('list_stadiums', logs.output[0])
+        self.assertIn('peak allocation', logs.output[0])
+        self.assertFalse(tracemalloc.is_tracing())
+        route = next(r for r in self.stats()['routes'] if r['route'] == 'list_stadiums')
+        self.assertEqual(route['traced'], 1)
+        self.assertEqual(route['over_budget'], 1)
+        self.assertGreater(route['max_peak'], 0)
+
+    @override_settings(MEMORY_TRACE_RATE=1.0)
+    def test_overlapping_requests_keep_no_peak(self):
+        """Test overlapping requests record RSS only, since a peak would include both"""
+        factory = RequestFactory()
+
+        def get_response(request):
+            if request.path == '/outer':
+                middleware(factory.get('/inner'))
+                self.assertTrue(tracemalloc.is_tracing())
+            return HttpResponse()
+
+        middleware = MemoryTelemetryMiddleware(get_response)
+        middleware(factory.get('/outer'))
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertFalse(middleware.trace_lock.locked())
+        route = memory.stats.routes['GET', 'unresolved']
+        self.assertEqual(route['requests'], 2)
+        self.assertEqual(route['traced'], 0)
+
+    def test_snapshot_needs_tracing(self):
+        """Test snapshots are refused unless tracemalloc is tracing"""
+        response = self.client.get('/api/memory/snapshot', HTTP_X_STAFF_TOKEN='secret')
+        self.assertEqual(response.status_code, 409)
+
+    def test_snapshot(self):
+        """Test the snapshot lists the largest live allocations"""
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        retained = [bytearray(100000) for _ in range(10)]
+        response = self.client.get('/api/memory/snapshot?limit=5', HTTP_X_STAFF_TOKEN='secret')
+        self.assertEqual(response.status_code, 200)
+        allocations = response.json()
+        self.assertEqual(len(allocations), 5)
+        self.assertTrue(any(a['file'].endswith('test_memory.py') for a in allocations))
+        self.assertGreaterEqual(allocations[0]['size'], allocations[-1]['size'])
+        del retained
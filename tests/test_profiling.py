@@ -0,0 +1,91 @@
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, override_settings
+from stadiapp.middleware import ProfilingMiddleware
+from stadiapp.models import Stadium
+from stadiapp import profiling
+import pstats
+import tempfile
+
+class ProfilingTestCase(TestCase):
+    """Test on-demand request profiling"""
+
+    def setUp(self):
+        self.client = Client()
+        self.stadium = Stadium.objects.create(
+            name='Fenway Park',
+            sport='Baseball',
+            city='Boston',
+            state='Massachusetts',
+            capacity=37755
+        )
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=tmp.name,
+                                     STAFF_TOKEN='secret', PROFILING_MAX_FILES=2)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_disabled_by_default(self):
+        """Test nothing is profiled when profiling is disabled"""
+        with override_settings(PROFILING_ENABLED=False):
+            response = Client().get('/api/stadiums', HTTP_X_PROFILE='cprofile', HTTP_X_STAFF_TOKEN='secret')
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_profile_requires_staff_token(self):
+        """Test the X-Profile header is ignored without staff access"""
+        response = self.client.get('/api/stadiums', HTTP_X_PROFILE='cprofile', HTTP_X_STAFF_TOKEN='wrong')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(self.client.get('/api/profiles').status_code, 401)
+
+    def test_cprofile_request(self):
+        """Test a profiled request stores a pstats file that can be downloaded"""
+        response = self.client.get('/api/stadiums', HTTP_X_PROFILE='cprofile', HTTP_X_STAFF_TOKEN='secret')
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile-Id']
+        self.assertIn('-list_stadiums-', name)
+        pstats.Stats(str(profiling.profile_path(name)))
+
+        response = self.client.get('/api/profiles', HTTP_X_STAFF_TOKEN='secret')
+        self.assertEqual([p['name'] for p in response.json()], [name])
+        response = self.client.get(f'/api/profiles/{name}', HTTP_X_STAFF_TOKEN='secret')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/profiles/..%2Fsettings.pstats', HTTP_X_STAFF_TOKEN='secret')
+        self.assertEqual(response.status_code, 404)
+
+    def test_overlapping_cprofile_requests(self):
+        """Test a request overlapping a cProfile one falls back to the sampler"""
+        factory = RequestFactory(HTTP_X_PROFILE='cprofile', HTTP_X_STAFF_TOKEN='secret')
+        inner = []
+
+        def get_response(request):
+            if request.path == '/api/stadiums':
+                inner.append(middleware(factory.get('/api/healthcheck')))
+            return HttpResponse()
+
+        middleware = ProfilingMiddleware(get_response)
+        outer = middleware(factory.get('/api/stadiums'))
+        self.assertTrue(outer['X-Profile-Id'].endswith('.pstats'))
+        self.assertTrue(inner[0]['X-Profile-Id'].endswith('.collapsed'))
+        self.assertFalse(ProfilingMiddleware.cprofile_lock.locked())
+
+    def test_sampled_route_and_retention(self):
+        """Test route sampling writes collapsed stacks and old profiles are pruned"""
+        with override_settings(PROFILING_SAMPLE_RATES={('GET', 'get_stadium'): 1.0}, PROFILING_MODE='sample'):
+            for _ in range(3):
+                response = self.client.get(f'/api/stadiums/{self.stadium.id}')
+                self.assertTrue(response['X-Profile-Id'].endswith('.collapsed'))
+                self.assertIn('-get-get_stadium-', response['X-Profile-Id'])
+            response = self.client.get('/api/healthcheck')
+            self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(len(profiling.list_profiles()), 2)
+
+    def test_sample_rates_match_method(self):
+        """Test sampling reads of a path does not profile writes to it"""
+        with override_settings(PROFILING_SAMPLE_RATES={('GET', 'get_stadium'): 1.0}):
+            response = self.client.delete(f'/api/stadiums/{self.stadium.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        with override_settings(PROFILING_SAMPLE_RATES={('GET', 'list_stadiums'): 1.0}):
+            response = self.client.get('/api/stadiums')
+        self.assertIn('-get-list_stadiums-', response['X-Profile-Id'])
@@ -0,0 +1,204 @@
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from stadiapp.models import City, Sport, Stadium, StadiumChange, State
+import json
+import re
+
+# Postgres takes an advisory lock before writing the change log.
+CHANGE_LOG_LOCK = 1 if connection.vendor == 'postgresql' else 0
+
+# Writes look up the sport, city and state ids by name, one query each. A
+# name with no lookup row yet costs a second query to insert it. Updates that
+# keep the names reuse the lookups loaded with the stadium.
+LOOKUPS = 3
+NEW_LOOKUPS = 2 * LOOKUPS
+
+# Queries each endpoint may run, whatever the size of the catalog. Writes
+# include replacing the stadium's change log entry in the same transaction.
+QUERY_BUDGETS = {
+    'list_stadiums': 1,
+    'get_stadium': 1,
+    'stadium_changes': 2,
+    'create_stadium': LOOKUPS + 3 + CHANGE_LOG_LOCK,
+    'create_stadium_new_lookups': NEW_LOOKUPS + 3 + CHANGE_LOG_LOCK,
+    'update_stadium': 4 + CHANGE_LOG_LOCK,
+    'update_stadium_new_lookups': NEW_LOOKUPS + 4 + CHANGE_LOG_LOCK,
+    'delete_stadium': 4 + CHANGE_LOG_LOCK,
+}
+
+DATASET_SIZES = [1, 10, 100]
+
+PAYLOAD = {
+    'name': 'Budget Stadium',
+    'sport': 'Sport 0',
+    'city': 'City 0',
+    'state': 'State 0',
+    'capacity': 50000
+}
+
+def seed(count):
+    sports = [Sport.lookup(f'Sport {i}') for i in range(5)]
+    cities = [City.lookup(f'City {i}') for i in range(50)]
+    states = [State.lookup(f'State {i}') for i in range(10)]
+    stadiums = Stadium.objects.bulk_create(
+        Stadium(name=f'Stadium {i}', sport_ref=sports[i % 5], city_ref=cities[i % 50],
+                state_ref=states[i % 10], capacity=i)
+        for i in range(count)
+    )
+    StadiumChange.record([stadium.id for stadium in stadiums], StadiumChange.UPSERT)
+    return stadiums
+
+class QueryBudgetTestCase(TestCase):
+    """Every endpoint runs a fixed number of queries at any dataset size"""
+
+    def setUp(self):
+        self.client = Client()
+
+    def assert_budget(self, endpoint, request):
+        with CaptureQueriesContext(connection) as ctx:
+            response = request()
+        self.assertLess(response.status_code, 300)
+        queries = [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))]
+        self.assertLessEqual(
+            len(queries), QUERY_BUDGETS[endpoint],
+            f'{endpoint} ran {len(queries)} queries:\n' + '\n'.join(queries)
+        )
+
+    def test_read_budgets(self):
+        """Test list, detail and change feed query counts"""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                stadiums = seed(size)
+                self.assert_budget('list_stadiums', lambda: self.client.get('/api/stadiums'))
+                self.assert_budget('list_stadiums', lambda: self.client.get(
+                    '/api/stadiums?sport=Sport 1&order_by=-capacity&limit=10'))
+                self.assert_budget('get_stadium', lambda: self.client.get(f'/api/stadiums/{stadiums[-1].id}'))
+                self.assert_budget('stadium_changes', lambda: self.client.get('/api/stadiums/changes?since=0'))
+                Stadium.objects.all().delete()
+                StadiumChange.objects.all().delete()
+
+    def test_write_budgets(self):
+        """Test create, update and delete query counts"""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                seed(size)
+                self.assert_budget('create_stadium', lambda: self.client.post(
+                    '/api/stadiums', data=json.dumps(PAYLOAD), content_type='application/json'))
+                stadium = Stadium.objects.get(name='Budget Stadium')
+                self.assert_budget('update_stadium', lambda: self.client.put(
+                    f'/api/stadiums/{stadium.id}', data=json.dumps(dict(PAYLOAD, capacity=1)),
+                    content_type='application/json'))
+                self.assert_budget('delete_stadium', lambda: self.client.delete(f'/api/stadiums/{stadium.id}'))
+                Stadium.objects.all().delete()
+                StadiumChange.objects.all().delete()
+
+    def test_new_lookup_budgets(self):
+        """Test writes that introduce new sport, city and state names"""
+        self.assert_budget('create_stadium_new_lookups', lambda: self.client.post(
+            '/api/stadiums', data=json.dumps(dict(PAYLOAD, sport='New Sport', city='New City', state='New State')),
+            content_type='application/json'))
+        stadium = Stadium.objects.get(name='Budget Stadium')
+        self.assert_budget('update_stadium_new_lookups', lambda: self.client.put(
+            f'/api/stadiums/{stadium.id}',
+            data=json.dumps(dict(PAYLOAD, sport='Other Sport', city='Other City', state='Other State')),
+            content_type='application/json'))
+
+    def test_assigning_names_runs_no_queries(self):
+        """Test names are resolved on save, not on assignment"""
+        with self.assertNumQueries(0):
+            stadium = Stadium(name='Unsaved', sport='Unsaved Sport', city='Unsaved City', state='Unsaved State')
+            self.assertEqual(stadium.sport, 'Unsaved Sport')
+        self.assertFalse(Sport.objects.filter(name='Unsaved Sport').exists())
+
+class QueryPlanTestCase(TestCase):
+    """Filtered and detail queries must use an index on a large table.
+
+    The SQL an endpoint actually runs is captured and passed to EXPLAIN, so a
+    dropped index or a query that stops matching one fails here.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.stadiums = seed(20000 if connection.vendor == 'postgresql' else 2000)
+        # Plans are checked with the statistics a loaded database has; the
+        # import command runs ANALYZE after every load.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        self.client = Client()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('EXPLAIN ' + sql)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    # Small lookup tables may be scanned; these may not.
+    LARGE_TABLES = ('stadiapp_stadium', 'stadiapp_stadiumchange')
+
+    def is_full_scan(self, plan):
+        tables = '|'.join(self.LARGE_TABLES)
+        if connection.vendor == 'postgresql':
+            return re.search(rf'Seq Scan on ({tables})\b', plan) is not None
+        # SQLite reports "SCAN <table>" for a full scan and "SCAN <table> USING
+        # INDEX" for an index-ordered walk.
+        return any(
+            re.match(rf'SCAN ({tables})\b', line.strip()) and 'USING' not in line
+            for line in plan.splitlines()
+        )
+
+    def is_sorted_in_memory(self, plan):
+        if connection.vendor == 'postgresql':
+            return re.search(r'^\s*(->\s*)?Sort\b', plan, re.MULTILINE) is not None
+        return 'USE TEMP B-TREE FOR ORDER BY' in plan
+
+    def assert_index_plans(self, request, ordered=False):
+        """Check the plans of the SELECTs run by request.
+
+        With ordered, rows must also come out of an index in order rather than
+        through a sort of every matching row.
+        """
+        with CaptureQueriesContext(connection) as ctx:
+            response = request()
+        self.assertEqual(response.status_code, 200)
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            plan = self.explain(sql)
+            self.assertFalse(self.is_full_scan(plan), f'Full table scan for:\n{sql}\n{plan}')
+            if ordered:
+                self.assertFalse(self.is_sorted_in_memory(plan), f'Sort for:\n{sql}\n{plan}')
+        return response
+
+    def test_detail_plan(self):
+        """Test the detail query is an index lookup"""
+        self.assert_index_plans(lambda: self.client.get(f'/api/stadiums/{self.stadiums[1000].id}'))
+
+    def test_filter_plan(self):
+        """Test filtering by city uses the integer foreign key index"""
+        self.assert_index_plans(lambda: self.client.get('/api/stadiums?city=City 7'))
+
+    def test_sort_plans(self):
+        """Test each sort order with a limit walks an index, also after a cursor"""
+        for order_by in ['capacity', '-capacity', 'name', '-name', 'city', '-state']:
+            with self.subTest(order_by=order_by):
+                response = self.assert_index_plans(
+                    lambda: self.client.get(f'/api/stadiums?order_by={order_by}&limit=10'), ordered=True)
+                cursor = response['X-Next-Cursor']
+                self.assert_index_plans(
+                    lambda: self.client.get(f'/api/stadiums?order_by={order_by}&limit=10&after={cursor}'),
+                    ordered=True)
+
+    def test_top_n_within_filter_plan(self):
+        """Test "largest stadiums of a sport" reads the (sport, capacity, id) index in order"""
+        self.assert_index_plans(
+            lambda: self.client.get('/api/stadiums?sport=Sport 3&order_by=-capacity&limit=10'), ordered=True)
+
+    def test_changes_plan(self):
+        """Test the change feed reads from the cursor position with an index"""
+        cursor = StadiumChange.objects.order_by('-seq').values_list('seq', flat=True)[10]
+        self.assert_index_plans(lambda: self.client.get(f'/api/stadiums/changes?since={cursor}'))
@@ -35,4 +35,38 @@ class StadiumSchemaTestCase(TestCase):
         }
         
         with self.assertRaises(ValidationError):
-            CreateStadiumSchema(**invalid_data)
\ No newline at end of file
+            CreateStadiumSchema(**invalid_data)
+
+    def test_stadium_input_schema_strips_name(self):
+        """Test name is stripped and a blank name is rejected"""
+        from stadiapp.schemas import CreateStadiumSchema
+        from pydantic import ValidationError
+
+        schema = CreateStadiumSchema(name='  Fenway Park ', sport='Baseball', city='Boston', state='Massachusetts')
+        self.assertEqual(schema.name, 'Fenway Park')
+        with self.assertRaises(ValidationError):
+            CreateStadiumSchema(name='   ', sport='Baseball', city='Boston', state='Massachusetts')
+
+    def test_stadium_input_schema_capacity_limits(self):
+        """Test capacity upper limit and null capacity stored as 0"""
+        from stadiapp.schemas import CreateStadiumSchema
+        from pydantic import ValidationError
+
+        data = {'name': 'Big', 'sport': 'Football', 'city': 'City', 'state': 'State'}
+        self.assertEqual(CreateStadiumSchema(**data, capacity=200000).capacity, 200000)
+        with self.assertRaises(ValidationError):
+            CreateStadiumSchema(**data, capacity=200001)
+        schema = CreateStadiumSchema(**data, capacity=None)
+        self.assertEqual(schema.to_model_fields()['capacity'], 0)
+
+    def test_validate_stadium_batch(self):
+        """Test batch validation reports the index of invalid rows"""
+        from stadiapp.schemas import validate_stadium_batch
+        from pydantic import ValidationError
+
+        rows = [{'name': f'Stadium {i}', 'sport': 'Soccer', 'city': 'City', 'state': 'State'} for i in range(3)]
+        self.assertEqual([s.name for s in validate_stadium_batch(rows)], ['Stadium 0', 'Stadium 1', 'Stadium 2'])
+        rows[1]['capacity'] = -1
+        with self.assertRaises(ValidationError) as ctx:
+            validate_stadium_batch(rows)
+        self.assertEqual(ctx.exception.errors()[0]['loc'][0], 1)